@@ -1,22 +1,100 @@
 # app.py
-from flask import Flask, redirect, url_for
+from flask import Flask, Response, redirect, url_for
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
 
 def create_app():
+    from routes.startup import LAZY_START, REPORT, precompile_templates
+
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'chinese-homework-secret'
-    
-    from routes.chinese import chinese_bp
+
+    if not LAZY_START:
+        # Шрифт разбирается один раз при старте; без него приложение не запускается
+        with REPORT.step("import fpdf + load_fonts"):
+            from routes.fonts import load_fonts
+            load_fonts()
+
+    with REPORT.step("import routes.chinese"):
+        from routes.chinese import chinese_bp
     app.register_blueprint(chinese_bp, url_prefix='/chinese')
-    
+
+    # Упражнения в JSON/NDJSON для мобильного приложения и LMS — без PDF
+    from routes.api import api_bp
+    app.register_blueprint(api_bp, url_prefix='/chinese/api')
+
+    # Ссылки на статику с отпечатком содержимого и вечным кэшированием по ним
+    from routes.pages import cache_versioned_static, static_url
+    app.add_template_global(static_url)
+    app.after_request(cache_versioned_static)
+
     # Корневой маршрут — перенаправление на /chinese
     @app.route('/')
     def index():
         return redirect(url_for('chinese.index'))
-    
+
+    # Метрики в текстовом формате Prometheus; у каждого воркера gunicorn свои
+    from routes.metrics import REGISTRY
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    with REPORT.step("precompile_templates"):
+        precompile_templates(app)
     return app
 
+
+def warm_up(app):
+    """Прогрев: всё тяжёлое загружается заранее.
+
+    В режиме preload — в мастере перед fork, воркеры получают готовое;
+    в режиме lazy — фоном в каждом воркере, пока он уже принимает запросы.
+    """
+    from routes.startup import REPORT
+
+    started = time.perf_counter()
+    with REPORT.step("import routes.documents"):
+        import routes.documents  # noqa: F401 — fpdf, шрифт, картинки
+        from routes.chinese import prerender_pages
+        from routes.fonts import load_fonts
+        from routes.hsk import load_vocabulary
+        from routes.images import preload_folder
+        from routes.pinyin import load_index
+
+    with REPORT.step("load_fonts"):
+        load_fonts()
+    with REPORT.step("preload_images"):
+        images = preload_folder()
+    # Индекс пиньиня собирается и отображается в память до fork: страницы файла делят все воркеры
+    with REPORT.step("load_pinyin_index"):
+        load_index()
+    with REPORT.step("load_vocabulary"):
+        load_vocabulary()
+
+    # Главная и страницы тем рендерятся и сжимаются заранее; заодно проверяется, что все они рендерятся
+    with REPORT.step("prerender_pages"), app.test_request_context():
+        pages = prerender_pages()
+
+    logger.info("Прогрев: %d страниц, %d картинок, %.2f с", pages, images, time.perf_counter() - started)
+
+
+def start_warm_up(app):
+    """Прогрев фоном: первый запрос не ждёт его, а нужное ему загрузит сам под теми же блокировками"""
+    thread = threading.Thread(target=warm_up, args=(app,), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
 if __name__ == '__main__':
     app = create_app()
+    from routes.startup import LAZY_START
+    if LAZY_START:
+        start_warm_up(app)
     port = int(os.environ.get("PORT", 5000))
     app.run(debug=False, host="0.0.0.0", port=port)
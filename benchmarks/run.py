@@ -0,0 +1,174 @@
+# benchmarks/run.py
+"""Бенчмарки генерации упражнений и PDF.
+
+    python benchmarks/run.py                  # прогон и сравнение с baseline.json
+    python benchmarks/run.py --save           # прогон и запись нового baseline.json
+    python benchmarks/run.py --filter family  # только случаи, в имени которых есть "family"
+
+Код возврата 1, если медиана какого-то случая выросла больше чем на --threshold;
+2, если baseline.json нет (сначала запишите его с --save на той же машине).
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from routes.chinese import FAMILY_IMAGE_PATHS  # noqa: E402
+from routes.documents import create_pdf, create_ready_lesson_pdf_family  # noqa: E402
+from routes.exercises import generate_exercises  # noqa: E402
+from routes.numerals import to_chinese_many  # noqa: E402
+from routes.themes import THEMES, convert_to_chinese  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+COUNTS = (5, 15, 20)
+# Большой лист: без повторов он упирается в размер пространства темы, поэтому с повторами
+LARGE_COUNT = 1000
+
+
+# ==================== ИЗМЕРЕНИЯ ====================
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def measure(func, iterations, warmup=1):
+    """Время (мс) по итерациям, пиковая память (КБ) отдельного прогона и размер результата"""
+    result = None
+    for _ in range(warmup):
+        result = func()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    # tracemalloc замедляет код, поэтому память меряем отдельным прогоном
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p90_ms": round(percentile(samples, 0.9), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "max_ms": round(max(samples), 3),
+        "peak_kb": round(peak / 1024, 1),
+        "size_bytes": len(result) if isinstance(result, (bytes, bytearray)) else None,
+    }
+
+
+def cases(iterations):
+    """(имя, функция, число итераций) для всех измеряемых случаев"""
+    client = create_app().test_client()
+
+    for theme_id in THEMES:
+        theme = THEMES[theme_id]
+        for count in COUNTS:
+            yield f"generate_exercises/{theme_id}/{count}", lambda t=theme, c=count: generate_exercises(t, c), iterations * 5
+        yield (
+            f"generate_exercises/{theme_id}/{LARGE_COUNT}",
+            lambda t=theme: generate_exercises(t, LARGE_COUNT, allow_repeats=True),
+            iterations,
+        )
+
+    for theme_id in THEMES:
+        theme = THEMES[theme_id]
+        exercises = generate_exercises(theme, 15, seed=1)
+        yield (
+            f"create_pdf/{theme_id}",
+            lambda t=theme, e=exercises: create_pdf(t["name"], t["theory"], e),
+            iterations,
+        )
+
+    yield "create_ready_lesson_pdf_family", lambda: create_ready_lesson_pdf_family(FAMILY_IMAGE_PATHS), iterations
+    yield "convert_to_chinese/1-100", lambda: [convert_to_chinese(n) for n in range(1, 101)], iterations * 5
+    yield "to_chinese_many/1-10000", lambda: to_chinese_many(range(1, 10001)), iterations
+
+    for theme_id in THEMES:
+        # Без seed каждый запрос получает новый код листа, так что кэш листов не срабатывает
+        yield (
+            f"flask/generate_pdf/{theme_id}",
+            lambda t=theme_id: client.post(f"/chinese/generate_pdf/{t}", data={"count": "15"}).get_data(),
+            iterations,
+        )
+
+
+# ==================== ОТЧЁТ ====================
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if not old or not old["p50_ms"]:
+            continue
+        change = stats["p50_ms"] / old["p50_ms"] - 1
+        stats["change"] = round(change, 3)
+        if change > threshold:
+            regressions.append((name, old["p50_ms"], stats["p50_ms"], change))
+    return regressions
+
+
+def print_table(results):
+    print(f"{'случай':<48} {'p50':>9} {'p90':>9} {'p99':>9} {'пик КБ':>9} {'размер':>9} {'Δp50':>7}")
+    for name, s in results.items():
+        size = s["size_bytes"] if s["size_bytes"] is not None else "-"
+        change = f"{s['change']:+.0%}" if "change" in s else "-"
+        print(f"{name:<48} {s['p50_ms']:>9.3f} {s['p90_ms']:>9.3f} {s['p99_ms']:>9.3f} "
+              f"{s['peak_kb']:>9.1f} {size:>9} {change:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=10, help="итераций на PDF-случай (генерация — ×5)")
+    parser.add_argument('--filter', default='', help="подстрока имени случая")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="файл baseline")
+    parser.add_argument('--save', action='store_true', help="записать результаты как новый baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="допустимый рост медианы, доля (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if not args.save and not os.path.exists(args.baseline):
+        # Без baseline сравнивать не с чем, а молча пройти — значит пропустить регрессию
+        print(f"Нет baseline: {args.baseline}. Запишите его: python benchmarks/run.py --save", file=sys.stderr)
+        return 2
+
+    logging.disable(logging.WARNING)
+    results = {}
+    for name, func, iterations in cases(args.iterations):
+        if args.filter in name:
+            results[name] = measure(func, iterations)
+
+    regressions = []
+    if not args.save:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    print_table(results)
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\nBaseline сохранён: {args.baseline}")
+
+    if regressions:
+        print(f"\nРегрессии (рост p50 больше {args.threshold:.0%}):")
+        for name, old, new, change in regressions:
+            print(f"  {name}: {old:.3f} → {new:.3f} мс ({change:+.0%})")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# gunicorn.conf.py
+import os
+
+from routes.admission import WEB_THREADS
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = WEB_THREADS
+worker_class = "gthread" if threads > 1 else "sync"
+
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("WEB_KEEPALIVE", 5))
+
+# Воркер перезапускается после стольких запросов (0 — никогда); jitter разносит перезапуски во времени
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", 100))
+
+# Приложение загружается и прогревается в мастере до fork: воркеры получают
+# шрифт, картинки и шаблоны готовыми и делят эту память copy-on-write.
+# При STARTUP_MODE=lazy мастер грузит только лёгкое, а прогрев идёт фоном в воркере
+preload_app = True
+
+
+def post_worker_init(worker):
+    from routes.startup import LAZY_START
+    if LAZY_START:
+        from app import start_warm_up
+        start_warm_up(worker.wsgi)
+
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("WEB_LOG_LEVEL", "info")
@@ -0,0 +1,96 @@
+# routes/admission.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .metrics import REGISTRY, Counter, Gauge
+
+# Потоков на воркер gunicorn; gunicorn.conf.py берёт значение отсюда, чтобы умолчание было одно
+WEB_THREADS = int(os.environ.get("WEB_THREADS", 4))
+# По умолчанию один поток воркера всегда свободен для страниц и кэшированных PDF
+RENDER_CONCURRENCY = int(os.environ.get("RENDER_CONCURRENCY", max(1, WEB_THREADS - 1)))
+RENDER_QUEUE_SIZE = int(os.environ.get("RENDER_QUEUE_SIZE", 8))
+RENDER_QUEUE_TIMEOUT = float(os.environ.get("RENDER_QUEUE_TIMEOUT", 10))
+RETRY_AFTER = int(os.environ.get("RENDER_RETRY_AFTER", 5))
+
+HIGH = 0
+NORMAL = 1
+
+
+class Overloaded(Exception):
+    """Рендер не принят: очередь полна или ожидание затянулось"""
+
+    def __init__(self, reason, retry_after=RETRY_AFTER):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# ==================== ОГРАНИЧЕНИЕ ОДНОВРЕМЕННЫХ РЕНДЕРОВ ====================
+
+class AdmissionGate:
+    """Не больше slots рендеров сразу; остальные ждут в ограниченной очереди.
+
+    Ожидающие с приоритетом HIGH получают освободившийся слот раньше NORMAL
+    и не отклоняются из-за заполненной очереди.
+    """
+
+    def __init__(self, slots=RENDER_CONCURRENCY, queue_size=RENDER_QUEUE_SIZE, timeout=RENDER_QUEUE_TIMEOUT):
+        self.slots = slots
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = [0, 0]
+        self._cond = threading.Condition()
+
+    @property
+    def queue_depth(self):
+        return sum(self.waiting)
+
+    def _can_start(self, priority):
+        if self.active >= self.slots:
+            return False
+        return priority == HIGH or not self.waiting[HIGH]
+
+    @contextmanager
+    def admit(self, priority=NORMAL):
+        with self._cond:
+            if not self._can_start(priority):
+                if priority == NORMAL and self.waiting[NORMAL] >= self.queue_size:
+                    REJECTED.inc("queue_full")
+                    raise Overloaded("queue_full")
+                self._wait(priority)
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def _wait(self, priority):
+        deadline = time.monotonic() + self.timeout
+        self.waiting[priority] += 1
+        try:
+            while not self._can_start(priority):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    REJECTED.inc("timeout")
+                    raise Overloaded("timeout")
+                self._cond.wait(remaining)
+        finally:
+            self.waiting[priority] -= 1
+            # Ушедший HIGH мог держать NORMAL в очереди
+            self._cond.notify_all()
+
+
+REJECTED = REGISTRY.register(Counter(
+    "chinese_render_rejected_total", "Рендеры, отклонённые с 503", ("reason",)))
+
+gate = AdmissionGate()
+
+REGISTRY.register(Gauge("chinese_render_queue_depth", "Рендеры, ждущие свободного слота",
+                        callback=lambda: gate.queue_depth))
+REGISTRY.register(Gauge("chinese_render_active", "Рендеры, занявшие слот",
+                        callback=lambda: gate.active))
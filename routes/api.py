@@ -0,0 +1,94 @@
+# routes/api.py
+import json
+import os
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
+
+from .exercises import MAX_SEED, generate_exercises, iter_exercises, new_seed
+from .history import normalize_student
+from .themes import THEMES
+
+api_bp = Blueprint('chinese_api', __name__)
+
+# Для приложений и LMS: лист бумаги не ограничивает, а NDJSON отдаётся по мере генерации
+MAX_API_EXERCISES = int(os.environ.get("MAX_API_EXERCISES", 1000))
+NDJSON = 'application/x-ndjson'
+
+
+def exercise_json(number, exercise):
+    return {
+        "number": number,
+        "type": exercise.kind,
+        "prompt": exercise.prompt,
+        "options": list(exercise.options),
+        "answer": exercise.answer,
+    }
+
+
+def _error(message, status):
+    return jsonify({"error": message}), status
+
+
+def _wants_ndjson():
+    requested = request.args.get('format')
+    if requested:
+        return requested == 'ndjson'
+    return request.accept_mimetypes.best_match(['application/json', NDJSON]) == NDJSON
+
+
+# ==================== МАРШРУТЫ API ====================
+
+@api_bp.route('/themes')
+def themes():
+    response = jsonify([
+        {
+            "id": theme_id,
+            "name": entry["name"],
+            "type": entry["type"],
+            "exercises_url": url_for('chinese_api.exercises', theme_id=theme_id),
+        }
+        for theme_id, entry in THEMES.catalog().items()
+    ])
+    # Каталог меняется редко: клиент переспрашивает с If-None-Match и получает 304
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@api_bp.route('/exercises/<theme_id>')
+def exercises(theme_id):
+    """Упражнения темы: JSON целиком или NDJSON (format=ndjson) — по строке на упражнение"""
+    if theme_id not in THEMES:
+        return _error("Тема не найдена", 404)
+
+    seed = request.args.get('seed', '').strip()
+    try:
+        count = int(request.args.get('count', 15))
+        seed = int(seed) if seed else new_seed()
+    except ValueError:
+        return _error("Неверное количество заданий или код листа", 400)
+    if not 1 <= count <= MAX_API_EXERCISES:
+        return _error(f"Количество заданий должно быть от 1 до {MAX_API_EXERCISES}", 400)
+    if not 0 <= seed <= MAX_SEED:
+        return _error(f"Код листа должен быть от 0 до {MAX_SEED}", 400)
+    try:
+        student = normalize_student(request.args.get('student'))
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    theme = THEMES[theme_id]
+    if _wants_ndjson():
+        def lines():
+            for number, exercise in enumerate(iter_exercises(theme, count, seed=seed, student=student), 1):
+                yield json.dumps(exercise_json(number, exercise), ensure_ascii=False) + '\n'
+
+        response = Response(stream_with_context(lines()), mimetype=NDJSON)
+    else:
+        items = generate_exercises(theme, count, seed=seed, student=student)
+        response = jsonify({
+            "theme": theme_id,
+            "name": theme["name"],
+            "seed": seed,
+            "exercises": [exercise_json(number, exercise) for number, exercise in enumerate(items, 1)],
+        })
+    response.headers['X-Worksheet-Seed'] = str(seed)
+    return response
@@ -0,0 +1,166 @@
+# routes/cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+CachedPDF = namedtuple('CachedPDF', 'key data etag last_modified')
+
+_digest_lock = threading.Lock()
+_file_digests = {}
+
+
+# ==================== ХЭШИ ВХОДНЫХ ДАННЫХ ====================
+
+def file_digest(path):
+    """sha256 содержимого файла; пересчитывается только при смене mtime/размера"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _file_digests.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digest_lock:
+        _file_digests[path] = (signature, digest)
+    return digest
+
+
+def content_key(paths, *extra):
+    """Ключ кэша: хэш содержимого файлов плюс дополнительные части (например, дата)"""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.basename(path).encode('utf-8'))
+        h.update(file_digest(path).encode('ascii'))
+    for part in extra:
+        h.update(str(part).encode('utf-8'))
+    return h.hexdigest()
+
+
+# ==================== КЭШ ГОТОВЫХ PDF ====================
+
+class ContentCache:
+    """Готовые PDF по имени; для каждого имени хранится только версия с актуальным ключом"""
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, name, key, build):
+        entry = self._entries.get(name)
+        if entry is not None and entry.key == key:
+            return entry
+
+        with self._lock:
+            name_lock = self._locks.setdefault(name, threading.Lock())
+        # Пока один поток собирает PDF, остальные ждут его, а не собирают свой
+        with name_lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.key != key:
+                data = bytes(build())
+                entry = CachedPDF(
+                    key=key,
+                    data=data,
+                    etag=hashlib.sha256(data).hexdigest()[:32],
+                    last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+                )
+                self._entries[name] = entry
+        return entry
+
+
+# ==================== LRU-КЭШ ОТРЕНДЕРЕННЫХ ЛИСТОВ ====================
+
+class _Flight:
+    """Сборка значения, которая уже идёт: результат (или ошибка) для тех, кто её ждёт"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.error = None
+
+
+class LRUBytesCache:
+    """Кэш байтов с ограничением по суммарному размеру; вытесняются давно не запрошенные"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def get_or_build(self, key, build):
+        """Как get, но при промахе собирает значение через build() и кладёт в кэш.
+
+        Одинаковые одновременные промахи собираются один раз: остальные потоки ждут
+        первого и получают его результат. Если сборка упала (например, Overloaded у
+        ворот рендера), ждущие получают ту же ошибку, а не встают в очередь по одному.
+        """
+        while True:
+            with self._lock:
+                data = self._items.get(key)
+                if data is not None:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return data
+                flight = self._building.get(key)
+                if flight is None:
+                    flight = self._building[key] = _Flight()
+                    self.misses += 1
+                    break
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.data is not None:
+                with self._lock:
+                    self.hits += 1
+                return flight.data
+
+        try:
+            flight.data = build()
+            self.put(key, flight.data)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._building[key]
+            flight.done.set()
+        return flight.data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
@@ -1,422 +1,452 @@
 # routes/chinese.py
 import os
-import random
-from datetime import datetime
-from flask import Blueprint, render_template, request, send_file
-from fpdf import FPDF
-
+import zipfile
+from datetime import datetime, time, timedelta
+from io import BytesIO
+from flask import (
+    Blueprint, get_template_attribute, jsonify, make_response, redirect, render_template, request, send_file, url_for,
+)
+from markupsafe import Markup
+
+from .admission import HIGH, Overloaded, gate
+from .cache import ContentCache, LRUBytesCache, content_key
+from .exercises import MAX_SEED, generate_exercises, iter_exercises, new_seed
+from .history import normalize_student
+from .hsk import WORDS_PATH
+from .jobs import DONE, JobQueue
+from .metrics import REGISTRY, Gauge, observe_pdf_size, rendering, stage, timed_iter, track_request
+from .pages import PageCache, send_page, static_version
+from .pinyin import ruby
+from .render_pool import get_pool, wait_all
 from .themes import THEMES
 
 chinese_bp = Blueprint('chinese', __name__, template_folder='../templates/chinese')
+chinese_bp.add_app_template_filter(ruby, 'ruby')
 
+FAMILY_IMAGE_DIR = os.path.join(os.path.dirname(__file__), '..', 'static', 'images', 'family')
+FAMILY_IMAGE_PATHS = [os.path.join(FAMILY_IMAGE_DIR, f"{i}.png") for i in range(1, 7)]
+FAMILY_LESSON_FILENAME = "Моя_семья_HSK3_готовый_урок.pdf"
 
-# ==================== ГЕНЕРАТОР УПРАЖНЕНИЙ ДЛЯ ВСЕХ ТЕМ ====================
-
-def generate_exercises(theme_config, count=15):
-    ANSWER_LINE = "____________"
-
-    theme_type = theme_config["type"]
-    raw_data = theme_config["data"]
-    data_pairs = [(k, v) for k, v in raw_data.items() if k and v and str(k).strip() and str(v).strip()]
-    exercises = []
-
-    if not data_pairs:
-        return [f"{i}. Данные недоступны" for i in range(1, count + 1)]
-
-    # Специальная логика для "Семьи"
-    if theme_config.get("name") == "Семья":
-        senior_junior = {
-            "哥哥": "старший брат", "姐姐": "старшая сестра",
-            "弟弟": "младший брат", "妹妹": "младшая сестра"
-        }
-        senior_terms = {"哥哥", "姐姐"}
-        used = set()
-
-        while len(exercises) < count - 1:
-            task_type = random.choices(
-                ["translate", "context_fill", "choose_senior_junior", "correct_mistake"],
-                weights=[4, 3, 2, 1]
-            )[0]
-
-            try:
-                if task_type == "translate":
-                    ch, ru = random.choice(data_pairs)
-                    ex = f"Переведи на русский: {ch} → {ANSWER_LINE}" if random.choice([True, False]) \
-                        else f"Напиши по-китайски: {ru} → {ANSWER_LINE}"
-                elif task_type == "context_fill":
-                    word = random.choice(list(senior_junior.keys()))
-                    meaning = senior_junior[word]
-                    rel = "старше" if word in senior_terms else "младше"
-                    ex = f"У меня есть {meaning}. Значит, он/она {rel} меня. Напиши это по-китайски: {ANSWER_LINE}"
-                elif task_type == "choose_senior_junior":
-                    name = random.choice(["Ли Миня", "Ани", "Тани", "Вани"])
-                    sib = random.choice(["брат", "сестра"])
-                    is_senior = random.choice([True, False])
-                    if sib == "брат":
-                        corr = "哥哥" if is_senior else "弟弟"
-                        wrong = "弟弟" if is_senior else "哥哥"
-                        adj = "старший" if is_senior else "младший"
-                    else:
-                        corr = "姐姐" if is_senior else "妹妹"
-                        wrong = "妹妹" if is_senior else "姐姐"
-                        adj = "старшая" if is_senior else "младшая"
-                    opts = [corr, wrong]
-                    random.shuffle(opts)
-                    ex = f"У {name} есть {adj} {sib}. Как это будет по-китайски?\n  □ {opts[0]}\n  □ {opts[1]}"
-                elif task_type == "correct_mistake":
-                    ex = f"Исправь ошибку: «我有弟弟» — но на самом деле он СТАРШЕ меня. Правильно: {ANSWER_LINE}"
-
-                if ex and len(ex) < 200 and ex not in used:
-                    used.add(ex)
-                    exercises.append(ex)
-            except:
-                continue
-
-        exercises.append(
-            "Напиши 2–3 предложения о своей семье на китайском языке.\n"
-            "Используй слова: 爸爸, 妈妈 и одно из: 哥哥, 姐姐, 弟弟, 妹妹."
-        )
-        return exercises
-
-    # Специальная логика для "Дата"
-    if theme_config.get("name") == "Дата":
-        today = datetime.now()
-        months_ru = ['января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
-                     'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря']
-        today_ru = f"{today.day} {months_ru[today.month - 1]} {today.year} года"
-
-        events = [
-            ("Новый год", "1月1日", "1 января"),
-            ("Мой день рождения", "5月3日", "3 мая"),
-            ("День учителя в Китае", "9月10日", "10 сентября"),
-            ("Национальный день КНР", "10月1日", "1 октября"),
-            ("Международный женский день", "3月8日", "8 марта"),
-            ("День защиты детей", "6月1日", "1 июня"),
-        ]
-
-        wrong_orders = [
-            "{day}年{month}月{year}日",
-            "{month}日{day}月{year}年",
-            "{year}月{month}日{day}年",
-            "{day}月{year}年{month}日"
-        ]
-
-        used = set()
-        while len(exercises) < count - 1:
-            task_type = random.choices(
-                ["today_fill", "birthday_fill", "translate_date", "write_date", "correct_mistake", "event_date", "ask_question"],
-                weights=[2, 2, 2, 2, 1, 2, 1]
-            )[0]
-
-            try:
-                if task_type == "today_fill":
-                    ex = f"Сегодня {today_ru}. Напиши это по-китайски:\n今天是______年______月______日。"
-                elif task_type == "birthday_fill":
-                    ex = "Мой день рождения — 12 апреля. Напиши это по-китайски:\n我的生日是______月______日。"
-                elif task_type == "translate_date":
-                    sample_dates = ["2025年10月27日", "1999年5月3日", "2004年12月31日", "2030年7月15日"]
-                    ch_date = random.choice(sample_dates)
-                    ex = f"Переведи на русский: {ch_date} → ______"
-                elif task_type == "write_date":
-                    ru_examples = [
-                        ("15 марта 2010 года", "2010年3月15日"),
-                        ("30 декабря 1985 года", "1985年12月30日"),
-                        ("1 января 2000 года", "2000年1月1日")
-                    ]
-                    ru, _ = random.choice(ru_examples)
-                    ex = f"Напиши по-китайски: {ru} → ______"
-                elif task_type == "correct_mistake":
-                    year, month, day = 2025, 10, 27
-                    wrong_fmt = random.choice(wrong_orders)
-                    wrong_str = wrong_fmt.format(year=year, month=month, day=day)
-                    ex = f"Исправь ошибку: 今天是{wrong_str}。 Правильно: ________________________"
-                elif task_type == "event_date":
-                    name, ch, ru = random.choice(events)
-                    ex = f"{name} отмечают {ru}. Напиши дату по-китайски: ______"
-                elif task_type == "ask_question":
-                    ex = "Как спросить «Какое сегодня число?» по-китайски? Напиши: ______"
-
-                if ex and len(ex) < 250 and ex not in used:
-                    used.add(ex)
-                    exercises.append(ex)
-            except:
-                continue
-
-        exercises.append(
-            "Напиши по-китайски:\n"
-            "1. Сегодняшнюю дату.\n"
-            "2. Дату своего дня рождения."
-        )
-        return exercises
-
-    # Специальная логика для "HSK3"
-    if theme_config.get("name") == "Повседневные ситуации (HSK 3)":
-        pairs = [(k, v) for k, v in theme_config["data"].items() if k and v]
-        used = set()
-
-        while len(exercises) < count:
-            task_type = random.choices(
-                ["translate_ru_to_ch", "complete_sentence", "choose_correct", "fix_word_order", "make_sentence"],
-                weights=[3, 2, 2, 2, 1]
-            )[0]
-
-            try:
-                if task_type == "translate_ru_to_ch":
-                    ru, ch = random.choice(pairs)
-                    ex = f"Переведи на китайский (естественно, как носитель):\n{ru}\n→ ____________"
-                elif task_type == "complete_sentence":
-                    prompts = [
-                        ("Вчера я хотел пойти в кино, но", "у меня заболела голова."),
-                        ("Если завтра будет солнечно, мы", "пойдём в парк."),
-                        ("Я не знаю, где", "мой телефон."),
-                        ("Она устала, потому что", "работала весь день."),
-                        ("Хотя он занят,", "он помог мне.")
-                    ]
-                    start, end = random.choice(prompts)
-                    ex = f"Заверши предложение логично:\n{start} ________"
-                elif task_type == "choose_correct":
-                    correct_examples = [
-                        "我把书放在桌子上了。",
-                        "这个电影比那个有意思。",
-                        "我还没做作业呢。",
-                        "虽然下雨，但是我还是去散步。"
-                    ]
-                    wrong_examples = [
-                        "我放书在桌子上了。",
-                        "这个电影比那个更更有趣。",
-                        "我没做作业已经。",
-                        "虽然下雨，但是我还是去散步了."
-                    ]
-                    corr = random.choice(correct_examples)
-                    wrong = random.choice(wrong_examples)
-                    opts = [corr, wrong]
-                    random.shuffle(opts)
-                    ex = f"Выбери грамматически правильный вариант:\n  □ {opts[0]}\n  □ {opts[1]}"
-                elif task_type == "fix_word_order":
-                    scrambled = [
-                        ("桌子上了 / 书 / 我把 / 放在", "我把书放在桌子上了。"),
-                        ("电影 / 那个 / этот / интереснее", "这个电影比那个有意思。"),
-                        ("作业 / 我 / сделай / ещё / не", "我还没做作业呢。")
-                    ]
-                    wrong, correct = random.choice(scrambled)
-                    ex = f"Собери предложение из слов:\n{wrong}\n→ ____________"
-                elif task_type == "make_sentence":
-                    prompts = [
-                        ("Сделай предложение с 把: (книга, положить, полка)", "我把书放在书架上了。"),
-                        ("Сравни два фильма с 比", "这个电影比那个好看。"),
-                        ("Используй 因为…所以…: (дождь, не пойти в парк)", "因为下雨，所以我们没去公园。")
-                    ]
-                    instruction, _ = random.choice(prompts)
-                    ex = f"{instruction}\n→ ____________"
-
-                if ex and len(ex) < 300 and ex not in used:
-                    used.add(ex)
-                    exercises.append(ex)
-            except Exception:
-                continue
-
-        return exercises[:count]
-
-    # УНИВЕРСАЛЬНАЯ ЛОГИКА
-    for _ in range(count):
-        chinese, russian = random.choice(data_pairs)
-        if theme_type == "vocabulary":
-            ex = f"Переведи: {russian} → {ANSWER_LINE}" if random.choice([True, False]) \
-                else f"Напиши по-русски: {chinese} → {ANSWER_LINE}"
-        elif theme_type == "grammar":
-            ex = f"Переведи: {russian} → {ANSWER_LINE}" if random.choice([True, False]) \
-                else f"Составь фразу: {chinese} → {ANSWER_LINE}"
-        elif theme_type == "numbers":
-            num = random.choice(list(raw_data.keys()))
-            ch_num = raw_data[num]
-            ex = f"Напиши по-китайски: {num} → {ANSWER_LINE}" if random.choice([True, False]) \
-                else f"Напиши цифру: {ch_num} → {ANSWER_LINE}"
-        else:
-            ex = f"Задание: {chinese} → {ANSWER_LINE}"
-
-        if ex and len(ex) < 250:
-            exercises.append(ex)
-
-    return exercises[:count]
-
-
-# ==================== PDF ГЕНЕРАТОР (СТАБИЛЬНЫЙ) ====================
-
-class ChinesePDF(FPDF):
-    def __init__(self):
-        super().__init__()
-        self.set_margins(left=15, top=20, right=15)
-        self.set_auto_page_break(auto=True, margin=20)
-        font_path = os.path.join(os.path.dirname(__file__), '..', 'fonts', 'NotoSansTC-Regular.ttf')
-        if not os.path.exists(font_path):
-            raise RuntimeError(f"Шрифт не найден: {font_path}")
-        self.add_font("NotoSansTC", fname=font_path)
-        self.set_font("NotoSansTC", size=12)
-
-    def header(self):
-        self.set_font("NotoSansTC", size=14)
-        self.cell(0, 10, "Китайский язык — Домашнее задание", new_x="LMARGIN", new_y="NEXT", align='C')
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font("NotoSansTC", size=10)
-        self.cell(0, 10, f"Сгенерировано: {datetime.now().strftime('%d.%m.%Y')}", align='C')
-
-
-def create_pdf(title, theory, exercises, answers=None):
-    pdf = ChinesePDF()
-    pdf.add_page()
-
-    pdf.set_font("NotoSansTC", size=16)
-    pdf.cell(pdf.epw, 10, title, new_x="LMARGIN", new_y="NEXT", align='C')
-    pdf.ln(8)
-
-    pdf.set_font("NotoSansTC", size=12)
-    for line in theory:
-        text = str(line).strip() if line else ""
-        pdf.multi_cell(w=pdf.epw, h=7, text=text)
-    pdf.ln(5)
-
-    for i, ex in enumerate(exercises, 1):
-        pdf.set_font("NotoSansTC", size=12)
-        pdf.multi_cell(w=pdf.epw, h=8, text=f"{i}. {ex}")
-        pdf.ln(2)
-
-    if answers:
-        pdf.add_page()
-        pdf.set_font("NotoSansTC", size=14)
-        pdf.cell(pdf.epw, 10, "Ответы (для учителя)", new_x="LMARGIN", new_y="NEXT", align='C')
-        pdf.ln(5)
-        for i, ans in enumerate(answers, 1):
-            pdf.multi_cell(w=pdf.epw, h=8, text=f"{i}. {ans}")
-            pdf.ln(2)
-
-    filename = f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    import tempfile
-    filepath = os.path.join(tempfile.gettempdir(), filename)
-    pdf.output(filepath)
-    return filepath
-
-
-# ==================== ГОТОВЫЙ УРОК: СЕМЬЯ С КАРТИНКАМИ ====================
-
-def create_ready_lesson_pdf_family():
-    pdf = ChinesePDF()
-    pdf.add_page()
-
-    pdf.set_font("NotoSansTC", size=18)
-    pdf.cell(pdf.epw, 10, "我的家庭 — Моя семья", new_x="LMARGIN", new_y="NEXT", align='C')
-    pdf.set_font("NotoSansTC", size=12)
-    pdf.cell(pdf.epw, 6, "Домашнее задание • HSK 3", new_x="LMARGIN", new_y="NEXT", align='C')
-    pdf.ln(4)
-    pdf.multi_cell(pdf.epw, 6, "Напиши по одному предложению к каждой картинке. Используй слова: 爸爸, 妈妈, 哥哥, 妹妹, 爷爷, 奶奶, 在, 爱, 喜欢, 一起...")
-    pdf.ln(6)
-
-    image_dir = os.path.join(os.path.dirname(__file__), '..', 'static', 'images', 'family')
-
-    for i in range(1, 7):
-        image_path = os.path.join(image_dir, f"{i}.png")
-        if os.path.exists(image_path):
-            pdf.image(image_path, x=pdf.l_margin, w=pdf.epw)
-        else:
-            pdf.set_fill_color(240, 240, 240)
-            pdf.rect(pdf.l_margin, pdf.get_y(), pdf.epw, 40, style='F')
-            pdf.set_text_color(100, 100, 100)
-            pdf.set_xy(pdf.l_margin, pdf.get_y() + 15)
-            pdf.cell(pdf.epw, 10, f"[Изображение {i} отсутствует]", align='C')
-            pdf.set_text_color(0, 0, 0)
-            pdf.ln(40)
-
-        pdf.ln(4)
-        pdf.set_font("NotoSansTC", size=12)
-        pdf.cell(pdf.epw, 8, "Напиши предложение на китайском:", new_x="LMARGIN", new_y="NEXT")
-        pdf.cell(pdf.epw, 8, "________________________________________________________", new_x="LMARGIN", new_y="NEXT")
-        pdf.cell(pdf.epw, 8, "Перевод на русский:", new_x="LMARGIN", new_y="NEXT")
-        pdf.cell(pdf.epw, 8, "________________________________________________________", new_x="LMARGIN", new_y="NEXT")
-        pdf.ln(8)
-
-    # Словарик
-    pdf.add_page()
-    pdf.set_font("NotoSansTC", size=14)
-    pdf.cell(pdf.epw, 10, "Слова по теме «Семья» (HSK 3)", new_x="LMARGIN", new_y="NEXT")
-    pdf.ln(2)
-    vocab = [
-        "爸爸 — папа", "妈妈 — мама", "哥哥 — старший брат", "姐姐 — старшая сестра",
-        "弟弟 — младший брат", "妹妹 — младшая сестра", "爷爷 — дедушка (по отцу)",
-        "奶奶 — бабушка (по отцу)", "家人 — члены семьи", "一起 — вместе",
-        "爱 — любить", "喜欢 — нравиться", "在 — находится / занимается",
-        "做饭 — готовить еду", "看书 — читать книгу"
-    ]
-    for item in vocab:
-        pdf.set_font("NotoSansTC", size=12)
-        pdf.cell(pdf.epw, 8, item, new_x="LMARGIN", new_y="NEXT")
-
-    # Бонус
-    pdf.add_page()
-    pdf.set_font("NotoSansTC", size=14)
-    pdf.cell(pdf.epw, 10, "Бонус: Напиши о своей семье (3–5 предложений)", new_x="LMARGIN", new_y="NEXT")
-    pdf.ln(8)
-    for _ in range(5):
-        pdf.cell(pdf.epw, 8, "________________________________________________________", new_x="LMARGIN", new_y="NEXT")
-
-    # Ответы
-    pdf.add_page()
-    pdf.set_font("NotoSansTC", size=14)
-    pdf.cell(pdf.epw, 10, "Ответы (для самопроверки)", new_x="LMARGIN", new_y="NEXT")
-    pdf.ln(5)
-    answers = [
-        "我爸爸在做饭。",
-        "我妈妈喜欢看书。",
-        "我哥哥会踢足球。",
-        "我妹妹在画画。",
-        "我爷爷和奶奶在公园里。",
-        "我们一家人一起吃晚饭。"
-    ]
-    for i, ans in enumerate(answers, 1):
-        pdf.set_font("NotoSansTC", size=12)
-        pdf.cell(pdf.epw, 8, f"{i}. {ans}", new_x="LMARGIN", new_y="NEXT")
-
-    filename = "Моя_семья_HSK3_готовый_урок.pdf"
-    import tempfile
-    filepath = os.path.join(tempfile.gettempdir(), filename)
-    pdf.output(filepath)
-    return filepath
+# Верхняя граница заданий на лист: от неё зависит, сколько памяти займёт один документ
+MAX_EXERCISES = int(os.environ.get("MAX_EXERCISES", 100))
+MAX_CLASS_SET_VARIANTS = int(os.environ.get("MAX_CLASS_SET_VARIANTS", 40))
+CLASS_SET_TIMEOUT = int(os.environ.get("CLASS_SET_TIMEOUT", 25))
+
+MAX_JOB_WAIT = 30
+WORKSHEET_CACHE_BYTES = int(os.environ.get("WORKSHEET_CACHE_BYTES", 64 * 1024 * 1024))
+FRAGMENT_CACHE_BYTES = int(os.environ.get("FRAGMENT_CACHE_BYTES", 8 * 1024 * 1024))
+
+ready_lessons = ContentCache()
+pages = PageCache()
+worksheets = LRUBytesCache(WORKSHEET_CACHE_BYTES)
+fragments = LRUBytesCache(FRAGMENT_CACHE_BYTES)
+job_queue = JobQueue()
+
+REGISTRY.register(Gauge("chinese_worksheet_cache_bytes", "Объём кэша готовых листов", callback=lambda: worksheets.size))
+REGISTRY.register(Gauge("chinese_worksheet_cache_entries", "Листов в кэше", callback=lambda: len(worksheets)))
+
+
+def pdf_filename(title, extension='pdf'):
+    return f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+# ==================== КОМПЛЕКТ ВАРИАНТОВ ДЛЯ КЛАССА ====================
+
+def generate_variants(theme_config, count, variants):
+    """Различные пары (код листа, упражнения); если тема столько не даёт, варианты повторяются"""
+    result = []
+    seen = set()
+    attempts = 0
+    while len(result) < variants and attempts < variants * 10:
+        attempts += 1
+        seed = new_seed()
+        exercises = generate_exercises(theme_config, count, seed=seed)
+        key = tuple(exercises)
+        if key not in seen:
+            seen.add(key)
+            result.append((seed, exercises))
+    while len(result) < variants:
+        result.append(result[len(result) % len(seen)])
+    return result
 
 
 # ==================== МАРШРУТЫ ====================
 
+COUNT_ERROR = f"Количество заданий должно быть от 1 до {MAX_EXERCISES}"
+
+
+@chinese_bp.errorhandler(Overloaded)
+def overloaded(error):
+    message = f"Сервер сейчас занят другими листами. Попробуйте ещё раз через {error.retry_after} с."
+    return message, 503, {'Retry-After': str(error.retry_after)}
+
+
+CSS_FILE = 'chinese/css/chinese.css'
+
+
+def index_page():
+    catalog = THEMES.catalog()
+    # Страница зависит только от каталога тем и версии CSS в ссылке
+    key = (THEMES.version, static_version(CSS_FILE))
+    return pages.get_or_build("index", key, lambda: render_template('chinese/index.html', themes=catalog))
+
+
+def theme_page_content(theme_id, pinyin=False):
+    theme = THEMES[theme_id]
+    key = (THEMES.version, static_version(CSS_FILE))
+    return pages.get_or_build(
+        f"theme:{theme_id}:{'pinyin' if pinyin else 'plain'}", key,
+        lambda: render_template('chinese/module.html', theme_id=theme_id, theme=theme, pinyin=pinyin),
+    )
+
+
+def prerender_pages():
+    """Рендерит главную и все страницы тем заранее; нужен контекст запроса"""
+    index_page()
+    for theme_id in THEMES:
+        theme_page_content(theme_id)
+        theme_page_content(theme_id, pinyin=True)
+    return len(THEMES) * 2 + 1
+
+
+def _flag(name):
+    return request.values.get(name, '') in ('1', 'on', 'true')
+
+
 @chinese_bp.route('/')
 def index():
-    return render_template('chinese/index.html', themes=THEMES)
+    return send_page(index_page())
 
 
 @chinese_bp.route('/<theme_id>')
 def theme_page(theme_id):
     if theme_id not in THEMES:
         return "Тема не найдена", 404
-    return render_template('chinese/module.html', theme_id=theme_id, theme=THEMES[theme_id])
+    return send_page(theme_page_content(theme_id, _flag('pinyin')))
+
+
+def render_worksheet(theme_id, count, seed, answers='none', pinyin=False, student=None):
+    """Лист по теме; одинаковые (тема, количество, код листа, ответы, пиньинь, дата) отдаются из кэша.
+
+    answers: 'none' — только задания, 'section' — ключ в конце того же PDF,
+    'pair' — ZIP с листом ученика и листом учителя.
+    Лист для ученика (student) зависит от его истории и поэтому не кэшируется.
+    """
+    if student:
+        with gate.admit(), rendering():
+            return _render_worksheet(THEMES[theme_id], count, seed, answers, pinyin, student)
+
+    def build():
+        with gate.admit(), rendering():
+            return _render_worksheet(THEMES[theme_id], count, seed, answers, pinyin)
+
+    key = (theme_id, count, seed, answers, pinyin, datetime.now().strftime('%d.%m.%Y'), THEMES.version)
+    # Один и тот же лист, запрошенный несколькими одновременно, верстается один раз
+    return worksheets.get_or_build(key, build)
+
+
+def _render_worksheet(theme, count, seed, answers, pinyin, student=None):
+    from .documents import create_pdf, create_student_teacher_pdfs
+    # Задания строятся по одному прямо во время вёрстки, списком не собираются;
+    # их время идёт в этап generate_exercises, а не в layout
+    exercises = timed_iter("generate_exercises", iter_exercises(theme, count, seed=seed, student=student))
+    if answers == 'pair':
+        student_pdf, teacher_pdf = create_student_teacher_pdfs(
+            theme["name"], theme["theory"], exercises, seed, pinyin)
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+            zf.writestr(pdf_filename(f"{theme['name']} {seed} ученик"), student_pdf)
+            zf.writestr(pdf_filename(f"{theme['name']} {seed} учитель"), teacher_pdf)
+        return buffer.getvalue()
+    return create_pdf(
+        title=theme["name"],
+        theory=theme["theory"],
+        exercises=exercises,
+        with_answers=answers == 'section',
+        seed=seed,
+        pinyin=pinyin,
+    )
 
 
-@chinese_bp.route('/generate_pdf/<theme_id>', methods=['POST'])
+def _worksheet_params():
+    """(count, seed, answers, student) из формы или строки запроса; ValueError с текстом для ответа 400"""
+    seed = request.values.get('seed', '').strip()
+    try:
+        count = int(request.values.get('count', 15))
+        seed = int(seed) if seed else new_seed()
+    except ValueError:
+        raise ValueError("Неверное количество заданий или код листа")
+    if not 1 <= count <= MAX_EXERCISES:
+        raise ValueError(COUNT_ERROR)
+    if not 0 <= seed <= MAX_SEED:
+        raise ValueError(f"Код листа должен быть от 0 до {MAX_SEED}")
+    answers = request.values.get('answers', 'none')
+    if answers not in ('none', 'section', 'pair'):
+        raise ValueError("Параметр answers должен быть none, section или pair")
+    return count, seed, answers, normalize_student(request.values.get('student'))
+
+
+@chinese_bp.route('/generate_pdf/<theme_id>', methods=['GET', 'POST'])
 def generate_pdf_route(theme_id):
     if theme_id not in THEMES:
         return "Тема не найдена", 404
+    try:
+        count, seed, answers, student = _worksheet_params()
+    except ValueError as e:
+        return str(e), 400
+
+    if request.values.get('format') == 'html':
+        if student and request.method == 'POST':
+            # Выдача листа ученику — только здесь; страница по ссылке его лишь показывает
+            generate_exercises(THEMES[theme_id], count, seed=seed, student=student)
+        # GET с уже выбранным кодом листа: страницу можно обновить или отправить ссылкой
+        return redirect(url_for(
+            'chinese.worksheet_html', theme_id=theme_id, count=count, seed=seed, answers=answers,
+            pinyin=1 if _flag('pinyin') else None, student=student,
+        ), code=303)
 
-    count = int(request.form.get('count', 15))
     theme = THEMES[theme_id]
-    exercises = generate_exercises(theme, count)
+    with track_request("generate_pdf", theme_id):
+        data = render_worksheet(theme_id, count, seed, answers, _flag('pinyin'), student)
+        observe_pdf_size("generate_pdf", len(data))
+        extension = 'zip' if answers == 'pair' else 'pdf'
+        with stage("send_file"):
+            response = send_file(
+                BytesIO(data),
+                mimetype='application/zip' if answers == 'pair' else 'application/pdf',
+                as_attachment=True,
+                download_name=pdf_filename(f"{theme['name']} {seed}", extension),
+            )
+    response.headers['X-Worksheet-Seed'] = str(seed)
+    return response
+
+
+def render_practice_grid(theme_id):
+    def build():
+        from .documents import create_practice_grid_pdf
+        from .grids import practice_characters
+        theme = THEMES[theme_id]
+        with gate.admit(), rendering():
+            return create_practice_grid_pdf(theme["name"], practice_characters(theme))
+
+    key = (theme_id, 'grid', datetime.now().strftime('%d.%m.%Y'), THEMES.version)
+    return worksheets.get_or_build(key, build)
+
+
+@chinese_bp.route('/practice_grid/<theme_id>')
+def practice_grid_route(theme_id):
+    if theme_id not in THEMES:
+        return "Тема не найдена", 404
+    from .grids import practice_characters
+    theme = THEMES[theme_id]
+    if not practice_characters(theme, limit=1):
+        return "В теме нет иероглифов для прописей", 404
 
-    pdf_path = create_pdf(
-        title=theme["name"],
-        theory=theme["theory"],
-        exercises=exercises,
-        answers=None
+    with track_request("practice_grid", theme_id):
+        data = render_practice_grid(theme_id)
+        observe_pdf_size("practice_grid", len(data))
+        with stage("send_file"):
+            return send_file(
+                BytesIO(data),
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=pdf_filename(f"{theme['name']} прописи"),
+            )
+
+
+# ---------- лист в HTML для печати из браузера ----------
+
+def _fragment(key, build):
+    html = fragments.get(key)
+    if html is None:
+        html = str(build()).encode('utf-8')
+        fragments.put(key, html)
+    return Markup(html.decode('utf-8'))
+
+
+def worksheet_fragments(theme_id, count, seed, answers, pinyin, student=None):
+    """Теория и задания темы в HTML — те же упражнения, что в PDF с этим кодом листа.
+
+    Куски кэшируются отдельно от страницы: в ней ещё дата и ссылки, а теория общая для всех листов темы.
+    """
+    theme = THEMES[theme_id]
+    parts = 'chinese/worksheet_parts.html'
+    with_answers = answers != 'none'
+    theory = _fragment(
+        ('theory', theme_id, pinyin, THEMES.version),
+        lambda: get_template_attribute(parts, 'theory')(theme["theory"], pinyin),
     )
-    return send_file(pdf_path, as_attachment=True)
+
+    def build_exercises():
+        # Просмотр (обновление, предзагрузка, HEAD) историю ученика не сдвигает
+        items = generate_exercises(theme, count, seed=seed, student=student, record=False)
+        return get_template_attribute(parts, 'exercises')(items, with_answers, pinyin)
+
+    if student:
+        return theory, Markup(build_exercises())
+    # Дата в ключе, как в render_worksheet: тема «Дата» пишет в задания сегодняшний день
+    today = datetime.now().strftime('%d.%m.%Y')
+    key = ('exercises', theme_id, count, seed, with_answers, pinyin, today, THEMES.version)
+    return theory, _fragment(key, build_exercises)
+
+
+@chinese_bp.route('/worksheet/<theme_id>')
+def worksheet_html(theme_id):
+    """Лист для печати из браузера; ключ для учителя (answers=section или pair) — с новой страницы"""
+    if theme_id not in THEMES:
+        return "Тема не найдена", 404
+    try:
+        count, seed, answers, student = _worksheet_params()
+    except ValueError as e:
+        return str(e), 400
+
+    pinyin = _flag('pinyin')
+    theory_html, exercises_html = worksheet_fragments(theme_id, count, seed, answers, pinyin, student)
+    # Выданный ученику лист по тому же коду повторяется как был, так что PDF совпадёт со страницей
+    pdf_url = url_for(
+        'chinese.generate_pdf_route', theme_id=theme_id, count=count, seed=seed,
+        answers='section' if answers == 'pair' else answers, pinyin=1 if pinyin else None, student=student,
+    )
+    response = make_response(render_template(
+        'chinese/worksheet.html', theme_id=theme_id, theme=THEMES[theme_id], seed=seed,
+        theory_html=theory_html, exercises_html=exercises_html, pdf_url=pdf_url,
+        today=datetime.now().strftime('%d.%m.%Y'),
+    ))
+    response.headers['X-Worksheet-Seed'] = str(seed)
+    if student:
+        return response
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@chinese_bp.route('/generate_class_set/<theme_id>', methods=['POST'])
+def generate_class_set_route(theme_id):
+    if theme_id not in THEMES:
+        return "Тема не найдена", 404
+
+    try:
+        count = int(request.form.get('count', 15))
+        variants = int(request.form.get('variants', 30))
+    except ValueError:
+        return "Неверное количество заданий или вариантов", 400
+    if not 1 <= count <= MAX_EXERCISES:
+        return COUNT_ERROR, 400
+    if not 1 <= variants <= MAX_CLASS_SET_VARIANTS:
+        return f"Количество вариантов должно быть от 1 до {MAX_CLASS_SET_VARIANTS}", 400
+    output_format = request.form.get('format', 'pdf')
+    if output_format not in ('pdf', 'zip'):
+        return "Формат должен быть pdf или zip", 400
+
+    from .documents import create_class_set_pdf, create_class_set_zip
+    theme = THEMES[theme_id]
+    variant_list = generate_variants(theme, count, variants)
+
+    with gate.admit():
+        if output_format == 'zip':
+            data = create_class_set_zip(theme["name"], theme["theory"], variant_list, CLASS_SET_TIMEOUT)
+            mimetype = 'application/zip'
+        else:
+            # Один документ не распараллелить, но и верстать его лучше не в потоке веб-сервера
+            future = get_pool().submit(create_class_set_pdf, theme["name"], theme["theory"], variant_list)
+            data, = wait_all([future], CLASS_SET_TIMEOUT)
+            mimetype = 'application/pdf'
+
+    filename = pdf_filename(f"{theme['name']} {variants} вариантов", output_format)
+    return send_file(BytesIO(data), mimetype=mimetype, as_attachment=True, download_name=filename)
+
+
+# ---------- асинхронные задания ----------
+
+def render_job(theme_id, count, seed=None):
+    from .documents import create_pdf
+    theme = THEMES[theme_id]
+    exercises = generate_exercises(theme, count, seed=seed)
+    return get_pool().submit(create_pdf, theme["name"], theme["theory"], exercises, None, None, seed).result()
+
+
+def _job_response(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "error": job["error"],
+        "status_url": url_for('chinese.job_status', job_id=job["id"]),
+        "result_url": url_for('chinese.job_result', job_id=job["id"]) if job["status"] == DONE else None,
+    }
+
+
+@chinese_bp.route('/jobs/generate_pdf/<theme_id>', methods=['POST'])
+def submit_pdf_job(theme_id):
+    if theme_id not in THEMES:
+        return "Тема не найдена", 404
+
+    try:
+        count = int(request.form.get('count', 15))
+    except ValueError:
+        return "Неверное количество заданий", 400
+    if not 1 <= count <= MAX_EXERCISES:
+        return COUNT_ERROR, 400
+    job_queue.ensure_workers(render_job)
+    job_id = job_queue.submit(theme_id=theme_id, count=count, seed=new_seed())
+    response = jsonify(_job_response(job_queue.get(job_id)))
+    response.status_code = 202
+    response.headers['Location'] = url_for('chinese.job_status', job_id=job_id)
+    return response
+
+
+@chinese_bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    job_queue.ensure_workers(render_job)
+    wait = min(request.args.get('wait', 0, type=float), MAX_JOB_WAIT)
+    job = job_queue.wait(job_id, wait) if wait > 0 else job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Задание не найдено"}), 404
+    return jsonify(_job_response(job))
+
+
+@chinese_bp.route('/jobs/<job_id>/pdf')
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return "Задание не найдено", 404
+    if job["status"] != DONE:
+        return jsonify(_job_response(job)), 409
+    theme = THEMES.get(job["params"]["theme_id"], {"name": "Задание"})
+    return send_file(
+        job_queue.result_path(job_id),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=pdf_filename(theme["name"]),
+    )
+
+
+def _seconds_until_midnight():
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return max(int((midnight - now).total_seconds()), 1)
+
+
+def _build_ready_lesson_family():
+    # Готовый урок собирается раз в день и нужен всем сразу, поэтому идёт вне очереди
+    from .documents import create_ready_lesson_pdf_family
+    with gate.admit(HIGH), rendering():
+        return create_ready_lesson_pdf_family(FAMILY_IMAGE_PATHS)
 
 
 @chinese_bp.route('/download_ready_lesson/family')
 def download_ready_lesson_family():
-    pdf_path = create_ready_lesson_pdf_family()
-    return send_file(pdf_path, as_attachment=True)
\ No newline at end of file
+    # Меняются только картинки, словарь HSK и дата в подвале — они и образуют ключ кэша
+    with track_request("download_ready_lesson", "family"):
+        key = content_key(FAMILY_IMAGE_PATHS + [WORDS_PATH], datetime.now().strftime('%d.%m.%Y'))
+        lesson = ready_lessons.get_or_build("family", key, _build_ready_lesson_family)
+        observe_pdf_size("download_ready_lesson", len(lesson.data))
+        with stage("send_file"):
+            return send_file(
+                BytesIO(lesson.data),
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=FAMILY_LESSON_FILENAME,
+                etag=lesson.etag,
+                last_modified=lesson.last_modified,
+                max_age=_seconds_until_midnight(),
+                conditional=True,
+            )
@@ -0,0 +1,260 @@
+# routes/documents.py
+# Вёрстка PDF. Модуль тянет fpdf, шрифт и картинки, поэтому маршруты импортируют его при первом листе
+import os
+import zipfile
+from datetime import datetime, time
+from io import BytesIO
+
+from fpdf import FPDF
+
+from .fonts import FONT_FAMILY, attach_font, clone_document
+from .grids import layout_practice_grid
+from .hsk import load_vocabulary
+from .images import embed_image
+from .metrics import observe_pdf_sections, stage
+from .pdf_output import OptimizingOutputProducer
+from .pinyin import to_pinyin
+from .render_pool import render_many
+
+
+# ==================== PDF ГЕНЕРАТОР (СТАБИЛЬНЫЙ) ====================
+
+class ChinesePDF(FPDF):
+    def __init__(self, header_note=None, seed=None):
+        super().__init__()
+        self.header_note = header_note
+        self.seed = seed
+        self._next_section = None
+        self.set_margins(left=15, top=20, right=15)
+        self.set_auto_page_break(auto=True, margin=20)
+        self.set_compression(True)
+        # Шрифт и картинки у всех страниц общие — один словарь ресурсов вместо копии на каждой странице
+        self.single_resources_object = True
+        self.size_breakdown = None
+        attach_font(self)
+        self.set_font(FONT_FAMILY, size=12)
+
+    def output(self, *args, **kwargs):
+        kwargs.setdefault('output_producer_class', OptimizingOutputProducer)
+        data = super().output(*args, **kwargs)
+        if self.size_breakdown:
+            observe_pdf_sections(self.size_breakdown)
+        return data
+
+    def start_section(self, header_note, seed):
+        """Подпись и код листа для следующей страницы; подвал текущей страницы остаётся прежним"""
+        self._next_section = (header_note, seed)
+
+    def header(self):
+        if self._next_section is not None:
+            self.header_note, self.seed = self._next_section
+            self._next_section = None
+        title = "Китайский язык — Домашнее задание"
+        if self.header_note:
+            title = f"{title} • {self.header_note}"
+        self.set_font("NotoSansTC", size=14)
+        self.cell(0, 10, title, new_x="LMARGIN", new_y="NEXT", align='C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("NotoSansTC", size=10)
+        text = f"Сгенерировано: {datetime.now().strftime('%d.%m.%Y')}"
+        if self.seed is not None:
+            text = f"{text} • Код листа: {self.seed}"
+        self.cell(0, 10, text, align='C')
+
+
+def _pinyin_line(pdf, text):
+    """Строка пиньиня мелким серым шрифтом под строкой с иероглифами"""
+    reading = to_pinyin(text)
+    if not reading:
+        return
+    pdf.set_font("NotoSansTC", size=9)
+    pdf.set_text_color(110, 110, 110)
+    pdf.multi_cell(w=pdf.epw, h=5, text=reading)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("NotoSansTC", size=12)
+
+
+def _layout_worksheet(pdf, title, theory, exercises, pinyin=False):
+    """Теория и задания; exercises может быть генератором — он расходуется по ходу вёрстки.
+
+    Возвращает ответы в порядке заданий, чтобы ключ не требовал второго прохода.
+    """
+    pdf.add_page()
+
+    pdf.set_font("NotoSansTC", size=16)
+    pdf.cell(pdf.epw, 10, title, new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(8)
+
+    pdf.set_font("NotoSansTC", size=12)
+    for line in theory:
+        text = str(line).strip() if line else ""
+        pdf.multi_cell(w=pdf.epw, h=7, text=text)
+        if pinyin:
+            _pinyin_line(pdf, text)
+    pdf.ln(5)
+
+    answers = []
+    for i, ex in enumerate(exercises, 1):
+        pdf.set_font("NotoSansTC", size=12)
+        pdf.multi_cell(w=pdf.epw, h=8, text=f"{i}. {ex}")
+        if pinyin:
+            _pinyin_line(pdf, str(ex))
+        pdf.ln(2)
+        answers.append(ex.answer)
+    return answers
+
+
+def _layout_answers(pdf, answers):
+    pdf.add_page()
+    pdf.set_font("NotoSansTC", size=14)
+    pdf.cell(pdf.epw, 10, "Ответы (для учителя)", new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(5)
+    for i, ans in enumerate(answers, 1):
+        pdf.multi_cell(w=pdf.epw, h=8, text=f"{i}. {ans}")
+        pdf.ln(2)
+
+
+def create_pdf(title, theory, exercises, answers=None, header_note=None, seed=None, pinyin=False,
+               with_answers=False):
+    """Лист PDF; ключ — явный список answers или (with_answers) ответы самих заданий"""
+    with stage("font_load"):
+        pdf = ChinesePDF(header_note, seed)
+    with stage("layout"):
+        key = _layout_worksheet(pdf, title, theory, exercises, pinyin)
+        if with_answers:
+            answers = key
+        if answers:
+            _layout_answers(pdf, answers)
+
+    with stage("output"):
+        return bytes(pdf.output())
+
+
+def create_student_teacher_pdfs(title, theory, exercises, seed=None, pinyin=False):
+    """Лист ученика и лист учителя (тот же лист плюс ключ) за одну вёрстку теории и заданий"""
+    with stage("font_load"):
+        student = ChinesePDF(seed=seed)
+    with stage("layout"):
+        answers = _layout_worksheet(student, title, theory, exercises, pinyin)
+    with stage("clone"):
+        teacher = clone_document(student)
+    with stage("layout"):
+        _layout_answers(teacher, answers)
+    with stage("output"):
+        return bytes(student.output()), bytes(teacher.output())
+
+
+def create_class_set_pdf(title, theory, variants):
+    """Все варианты одним документом: шрифт подмножится и встроится один раз"""
+    pdf = ChinesePDF()
+    for n, (seed, exercises) in enumerate(variants, 1):
+        pdf.start_section(f"Вариант {n}", seed)
+        _layout_worksheet(pdf, title, theory, exercises)
+    return bytes(pdf.output())
+
+
+def create_practice_grid_pdf(title, characters):
+    """Прописи в клетках 田字格: клетка встраивается один раз, на страницах только ссылки на неё"""
+    with stage("font_load"):
+        pdf = ChinesePDF(header_note="Прописи")
+    with stage("layout"):
+        layout_practice_grid(pdf, title, characters, FONT_FAMILY)
+    with stage("output"):
+        return bytes(pdf.output())
+
+
+# ==================== КОМПЛЕКТ ВАРИАНТОВ ДЛЯ КЛАССА ====================
+
+def create_class_set_zip(title, theory, variants, timeout=None):
+    """Каждый вариант — отдельный PDF; вёрстка идёт параллельно в пуле процессов"""
+    jobs = [
+        (title, theory, exercises, None, f"Вариант {n}", seed)
+        for n, (seed, exercises) in enumerate(variants, 1)
+    ]
+    pdfs = render_many(create_pdf, jobs, timeout=timeout)
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        for n, pdf_bytes in enumerate(pdfs, 1):
+            zf.writestr(f"{title.replace(' ', '_')}_вариант_{n:02d}.pdf", pdf_bytes)
+    return buffer.getvalue()
+
+
+# ==================== ГОТОВЫЙ УРОК: СЕМЬЯ С КАРТИНКАМИ ====================
+
+def create_ready_lesson_pdf_family(image_paths):
+    with stage("font_load"):
+        pdf = ChinesePDF()
+    # Дата создания фиксирована на начало дня: в течение дня PDF побайтно одинаков,
+    # поэтому ETag совпадает во всех воркерах
+    pdf.set_creation_date(datetime.combine(datetime.now().date(), time.min).astimezone())
+    pdf.add_page()
+
+    pdf.set_font("NotoSansTC", size=18)
+    pdf.cell(pdf.epw, 10, "我的家庭 — Моя семья", new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.set_font("NotoSansTC", size=12)
+    pdf.cell(pdf.epw, 6, "Домашнее задание • HSK 3", new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(4)
+    pdf.multi_cell(pdf.epw, 6, "Напиши по одному предложению к каждой картинке. Используй слова: 爸爸, 妈妈, 哥哥, 妹妹, 爷爷, 奶奶, 在, 爱, 喜欢, 一起...")
+    pdf.ln(6)
+
+    for i, image_path in enumerate(image_paths, 1):
+        if os.path.exists(image_path):
+            with stage("embed_image"):
+                embed_image(pdf, image_path, x=pdf.l_margin, w=pdf.epw)
+        else:
+            pdf.set_fill_color(240, 240, 240)
+            pdf.rect(pdf.l_margin, pdf.get_y(), pdf.epw, 40, style='F')
+            pdf.set_text_color(100, 100, 100)
+            pdf.set_xy(pdf.l_margin, pdf.get_y() + 15)
+            pdf.cell(pdf.epw, 10, f"[Изображение {i} отсутствует]", align='C')
+            pdf.set_text_color(0, 0, 0)
+            pdf.ln(40)
+
+        pdf.ln(4)
+        pdf.set_font("NotoSansTC", size=12)
+        pdf.cell(pdf.epw, 8, "Напиши предложение на китайском:", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(pdf.epw, 8, "________________________________________________________", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(pdf.epw, 8, "Перевод на русский:", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(pdf.epw, 8, "________________________________________________________", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(8)
+
+    # Словарик
+    pdf.add_page()
+    pdf.set_font("NotoSansTC", size=14)
+    pdf.cell(pdf.epw, 10, "Слова по теме «Семья» (HSK 3)", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(2)
+    for word in load_vocabulary().words(max_level=3, topic="family"):
+        pdf.set_font("NotoSansTC", size=12)
+        pdf.cell(pdf.epw, 8, f"{word.hanzi} ({word.pinyin}) — {word.gloss}", new_x="LMARGIN", new_y="NEXT")
+
+    # Бонус
+    pdf.add_page()
+    pdf.set_font("NotoSansTC", size=14)
+    pdf.cell(pdf.epw, 10, "Бонус: Напиши о своей семье (3–5 предложений)", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(8)
+    for _ in range(5):
+        pdf.cell(pdf.epw, 8, "________________________________________________________", new_x="LMARGIN", new_y="NEXT")
+
+    # Ответы
+    pdf.add_page()
+    pdf.set_font("NotoSansTC", size=14)
+    pdf.cell(pdf.epw, 10, "Ответы (для самопроверки)", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(5)
+    answers = [
+        "我爸爸在做饭。",
+        "我妈妈喜欢看书。",
+        "我哥哥会踢足球。",
+        "我妹妹在画画。",
+        "我爷爷和奶奶在公园里。",
+        "我们一家人一起吃晚饭。"
+    ]
+    for i, ans in enumerate(answers, 1):
+        pdf.set_font("NotoSansTC", size=12)
+        pdf.cell(pdf.epw, 8, f"{i}. {ans}", new_x="LMARGIN", new_y="NEXT")
+
+    with stage("output"):
+        return bytes(pdf.output())
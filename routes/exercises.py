@@ -0,0 +1,479 @@
+# routes/exercises.py
+import hashlib
+import random
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+
+from .history import HISTORY, count_bits
+from .hsk import load_vocabulary
+from .themes import THEMES_CACHE_SIZE
+
+ANSWER_LINE = "____________"
+FREE_ANSWER = "Свободный ответ."
+
+
+class Exercise(namedtuple('Exercise', 'kind prompt answer options')):
+    """Упражнение вместе с ответом; str() даёт текст для листа ученика"""
+    __slots__ = ()
+
+    def __new__(cls, kind, prompt, answer, options=()):
+        return super().__new__(cls, kind, prompt, answer, tuple(options))
+
+    @property
+    def text(self):
+        return "".join([self.prompt] + [f"\n  □ {option}" for option in self.options])
+
+    def __str__(self):
+        return self.text
+
+
+# ==================== ПРОСТРАНСТВО УПРАЖНЕНИЙ ====================
+
+class ExerciseSpace:
+    """Все упражнения, которые может дать тема.
+
+    Группа — один тип задания: вес, число вариантов и функция build(i, rng),
+    которая лениво строит i-й вариант. Размер пространства известен заранее,
+    поэтому выборка без повторов всегда конечна.
+    """
+
+    def __init__(self):
+        self.groups = []
+
+    def add(self, name, weight, size, build):
+        if size > 0:
+            self.groups.append((name, weight, size, build))
+        return self
+
+    def add_items(self, name, weight, items):
+        items = list(items)
+        return self.add(name, weight, len(items), lambda i, rng: items[i])
+
+    @property
+    def size(self):
+        return sum(size for _, _, size, _ in self.groups)
+
+    def sample(self, count, rng=random, allow_repeats=False):
+        """Взвешенная выборка без повторов.
+
+        Если count больше размера пространства: при allow_repeats=False
+        выборка обрезается, иначе после исчерпания начинается новый круг.
+        """
+        return list(self.iter_sample(count, rng, allow_repeats))
+
+    def iter_sample(self, count, rng=random, allow_repeats=False, seen=None):
+        """То же, что sample, но задания строятся по одному, по мере запроса"""
+        for _, exercise in self.iter_sample_indexed(count, rng, allow_repeats, seen):
+            yield exercise
+
+    def iter_sample_indexed(self, count, rng=random, allow_repeats=False, seen=None):
+        """Пары (номер в пространстве, упражнение).
+
+        seen — битовая карта уже выданных номеров: сначала берутся невиданные,
+        и только когда их не хватает — уже виденные.
+        """
+        total = self.size
+        if not allow_repeats:
+            count = min(count, total)
+        if seen and count > 0:
+            unseen = total - count_bits(seen)
+            fresh = min(count, unseen)
+            old = min(count - fresh, total - unseen)
+            yield from self._sample_round(fresh, rng, self._pools(seen, False))
+            yield from self._sample_round(old, rng, self._pools(seen, True))
+            count -= fresh + old
+        while count > 0 and total:
+            round_size = min(count, total)
+            yield from self._sample_round(round_size, rng)
+            count -= round_size
+
+    def _pools(self, seen, want_seen):
+        """Номера внутри каждой группы, виденные (или нет) по карте seen"""
+        pools = []
+        offset = 0
+        for _, _, size, _ in self.groups:
+            pools.append([i for i in range(size) if _is_seen(seen, offset + i) == want_seen])
+            offset += size
+        return pools
+
+    def _sample_round(self, count, rng, pools=None):
+        # Ленивая перетасовка Фишера–Йетса по каждой группе: память O(count), а не O(size)
+        left = [size for _, _, size, _ in self.groups] if pools is None else [len(p) for p in pools]
+        offsets = [0]
+        for _, _, size, _ in self.groups:
+            offsets.append(offsets[-1] + size)
+        swaps = [{} for _ in self.groups]
+        for _ in range(count):
+            live = [g for g in range(len(self.groups)) if left[g]]
+            g = rng.choices(live, weights=[self.groups[g][1] for g in live])[0]
+            j = rng.randrange(left[g])
+            last = left[g] - 1
+            index = swaps[g].get(j, j)
+            swaps[g][j] = swaps[g].get(last, last)
+            left[g] = last
+            if pools is not None:
+                index = pools[g][index]
+            yield offsets[g] + index, self.groups[g][3](index, rng)
+
+    def fingerprint(self, *extra):
+        """Отпечаток нумерации: меняется, если меняются группы или данные темы"""
+        h = hashlib.sha256(repr([(name, weight, size) for name, weight, size, _ in self.groups]).encode('utf-8'))
+        for part in extra:
+            h.update(repr(part).encode('utf-8'))
+        return h.hexdigest()[:32]
+
+
+def _is_seen(seen, i):
+    byte = i >> 3
+    return byte < len(seen) and bool(seen[byte] >> (i & 7) & 1)
+
+
+def _pairs_both_ways(pairs, first, second):
+    """Каждая пара даёт два задания: first(a, b) для чётных индексов, second(a, b) для нечётных"""
+    def build(i, rng):
+        a, b = pairs[i // 2]
+        return first(a, b) if i % 2 == 0 else second(a, b)
+    return len(pairs) * 2, build
+
+
+def _shuffled(options, rng):
+    options = list(options)
+    rng.shuffle(options)
+    return tuple(options)
+
+
+# ==================== СПЕЦИАЛЬНЫЕ ТЕМЫ ====================
+
+def _family_space(theme_config, data_pairs):
+    senior_junior = {
+        "哥哥": "старший брат", "姐姐": "старшая сестра",
+        "弟弟": "младший брат", "妹妹": "младшая сестра"
+    }
+    senior_terms = {"哥哥", "姐姐"}
+    names = ["Ли Миня", "Ани", "Тани", "Вани"]
+
+    def context_fill(word):
+        rel = "старше" if word in senior_terms else "младше"
+        return Exercise(
+            "context_fill",
+            f"У меня есть {senior_junior[word]}. Значит, он/она {rel} меня. Напиши это по-китайски: {ANSWER_LINE}",
+            answer=f"我有{word}。",
+        )
+
+    def choose_senior_junior(i, rng):
+        name = names[i // 4]
+        sib = "брат" if (i // 2) % 2 == 0 else "сестра"
+        is_senior = i % 2 == 0
+        if sib == "брат":
+            corr = "哥哥" if is_senior else "弟弟"
+            wrong = "弟弟" if is_senior else "哥哥"
+            adj = "старший" if is_senior else "младший"
+        else:
+            corr = "姐姐" if is_senior else "妹妹"
+            wrong = "妹妹" if is_senior else "姐姐"
+            adj = "старшая" if is_senior else "младшая"
+        return Exercise(
+            "choose_senior_junior",
+            f"У {name} есть {adj} {sib}. Как это будет по-китайски?",
+            answer=corr,
+            options=_shuffled([corr, wrong], rng),
+        )
+
+    space = ExerciseSpace()
+    space.add("translate", 4, *_pairs_both_ways(
+        data_pairs,
+        lambda ch, ru: Exercise("translate", f"Переведи на русский: {ch} → {ANSWER_LINE}", answer=ru),
+        lambda ch, ru: Exercise("translate", f"Напиши по-китайски: {ru} → {ANSWER_LINE}", answer=ch),
+    ))
+    space.add_items("context_fill", 3, (context_fill(word) for word in senior_junior))
+    space.add("choose_senior_junior", 2, len(names) * 4, choose_senior_junior)
+    space.add_items("correct_mistake", 1, [Exercise(
+        "correct_mistake",
+        f"Исправь ошибку: «我有弟弟» — но на самом деле он СТАРШЕ меня. Правильно: {ANSWER_LINE}",
+        answer="我有哥哥。",
+    )])
+
+    closing = Exercise(
+        "free_writing",
+        "Напиши 2–3 предложения о своей семье на китайском языке.\n"
+        "Используй слова: 爸爸, 妈妈 и одно из: 哥哥, 姐姐, 弟弟, 妹妹.",
+        answer=FREE_ANSWER,
+    )
+    return space, closing
+
+
+def _date_space(theme_config, data_pairs):
+    today = datetime.now()
+    months_ru = ['января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+                 'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря']
+    today_ru = f"{today.day} {months_ru[today.month - 1]} {today.year} года"
+
+    events = [
+        ("Новый год", "1月1日", "1 января"),
+        ("Мой день рождения", "5月3日", "3 мая"),
+        ("День учителя в Китае", "9月10日", "10 сентября"),
+        ("Национальный день КНР", "10月1日", "1 октября"),
+        ("Международный женский день", "3月8日", "8 марта"),
+        ("День защиты детей", "6月1日", "1 июня"),
+    ]
+    wrong_orders = [
+        "{day}年{month}月{year}日",
+        "{month}日{day}月{year}年",
+        "{year}月{month}日{day}年",
+        "{day}月{year}年{month}日"
+    ]
+    sample_dates = [(2025, 10, 27), (1999, 5, 3), (2004, 12, 31), (2030, 7, 15)]
+    ru_examples = [
+        ("15 марта 2010 года", "2010年3月15日"),
+        ("30 декабря 1985 года", "1985年12月30日"),
+        ("1 января 2000 года", "2000年1月1日")
+    ]
+
+    space = ExerciseSpace()
+    space.add_items("today_fill", 2, [Exercise(
+        "today_fill",
+        f"Сегодня {today_ru}. Напиши это по-китайски:\n今天是______年______月______日。",
+        answer=f"今天是{today.year}年{today.month}月{today.day}日。",
+    )])
+    space.add_items("birthday_fill", 2, [Exercise(
+        "birthday_fill",
+        "Мой день рождения — 12 апреля. Напиши это по-китайски:\n我的生日是______月______日。",
+        answer="我的生日是4月12日。",
+    )])
+    space.add_items("translate_date", 2, (
+        Exercise("translate_date", f"Переведи на русский: {y}年{m}月{d}日 → ______", answer=f"{d} {months_ru[m - 1]} {y} года")
+        for y, m, d in sample_dates
+    ))
+    space.add_items("write_date", 2, (
+        Exercise("write_date", f"Напиши по-китайски: {ru} → ______", answer=ch) for ru, ch in ru_examples
+    ))
+    space.add_items("correct_mistake", 1, (
+        Exercise(
+            "correct_mistake",
+            f"Исправь ошибку: 今天是{fmt.format(year=2025, month=10, day=27)}。 Правильно: ________________________",
+            answer="今天是2025年10月27日。",
+        )
+        for fmt in wrong_orders
+    ))
+    space.add_items("event_date", 2, (
+        Exercise("event_date", f"{name} отмечают {ru}. Напиши дату по-китайски: ______", answer=ch)
+        for name, ch, ru in events
+    ))
+    space.add_items("ask_question", 1, [Exercise(
+        "ask_question",
+        "Как спросить «Какое сегодня число?» по-китайски? Напиши: ______",
+        answer="今天几月几号？",
+    )])
+
+    closing = Exercise(
+        "free_writing",
+        "Напиши по-китайски:\n"
+        "1. Сегодняшнюю дату.\n"
+        "2. Дату своего дня рождения.",
+        answer=f"1. 今天是{today.year}年{today.month}月{today.day}日。 2. {FREE_ANSWER}",
+    )
+    return space, closing
+
+
+def _hsk3_space(theme_config, data_pairs):
+    complete_prompts = [
+        ("Вчера я хотел пойти в кино, но", "у меня заболела голова."),
+        ("Если завтра будет солнечно, мы", "пойдём в парк."),
+        ("Я не знаю, где", "мой телефон."),
+        ("Она устала, потому что", "работала весь день."),
+        ("Хотя он занят,", "он помог мне.")
+    ]
+    correct_examples = [
+        "我把书放在桌子上了。",
+        "这个电影比那个有意思。",
+        "我还没做作业呢。",
+        "虽然下雨，但是我还是去散步。"
+    ]
+    wrong_examples = [
+        "我放书在桌子上了。",
+        "这个电影比那个更更有趣。",
+        "我没做作业已经。",
+        "虽然下雨，但是我还是去散步了."
+    ]
+    scrambled = [
+        ("桌子上了 / 书 / 我把 / 放在", "我把书放在桌子上了。"),
+        ("电影 / 那个 / этот / интереснее", "这个电影比那个有意思。"),
+        ("作业 / 我 / сделай / ещё / не", "我还没做作业呢。")
+    ]
+    make_prompts = [
+        ("Сделай предложение с 把: (книга, положить, полка)", "我把书放在书架上了。"),
+        ("Сравни два фильма с 比", "这个电影比那个好看。"),
+        ("Используй 因为…所以…: (дождь, не пойти в парк)", "因为下雨，所以我们没去公园。")
+    ]
+
+    def choose_correct(i, rng):
+        corr = correct_examples[i // len(wrong_examples)]
+        wrong = wrong_examples[i % len(wrong_examples)]
+        return Exercise(
+            "choose_correct",
+            "Выбери грамматически правильный вариант:",
+            answer=corr,
+            options=_shuffled([corr, wrong], rng),
+        )
+
+    space = ExerciseSpace()
+    space.add_items("translate_ru_to_ch", 3, (
+        Exercise("translate_ru_to_ch", f"Переведи на китайский (естественно, как носитель):\n{ru}\n→ ____________", answer=ch)
+        for ru, ch in data_pairs
+    ))
+    space.add_items("complete_sentence", 2, (
+        Exercise("complete_sentence", f"Заверши предложение логично:\n{start} ________", answer=f"Например: {end}")
+        for start, end in complete_prompts
+    ))
+    space.add("choose_correct", 2, len(correct_examples) * len(wrong_examples), choose_correct)
+    space.add_items("fix_word_order", 2, (
+        Exercise("fix_word_order", f"Собери предложение из слов:\n{wrong}\n→ ____________", answer=correct)
+        for wrong, correct in scrambled
+    ))
+    space.add_items("make_sentence", 1, (
+        Exercise("make_sentence", f"{instruction}\n→ ____________", answer=f"Например: {example}")
+        for instruction, example in make_prompts
+    ))
+    return space, None
+
+
+SPECIAL_SPACES = {
+    "Семья": _family_space,
+    "Дата": _date_space,
+    "Повседневные ситуации (HSK 3)": _hsk3_space,
+}
+
+
+# ==================== УНИВЕРСАЛЬНАЯ ЛОГИКА ====================
+
+def _universal_space(theme_config, data_pairs):
+    theme_type = theme_config["type"]
+    space = ExerciseSpace()
+
+    if theme_type == "vocabulary":
+        space.add("vocabulary", 1, *_pairs_both_ways(
+            data_pairs,
+            lambda chinese, russian: Exercise("translate", f"Переведи: {russian} → {ANSWER_LINE}", answer=chinese),
+            lambda chinese, russian: Exercise("translate", f"Напиши по-русски: {chinese} → {ANSWER_LINE}", answer=russian),
+        ))
+    elif theme_type == "grammar":
+        space.add("grammar", 1, *_pairs_both_ways(
+            data_pairs,
+            lambda chinese, russian: Exercise("translate", f"Переведи: {russian} → {ANSWER_LINE}", answer=chinese),
+            lambda chinese, russian: Exercise("translate", f"Составь фразу: {chinese} → {ANSWER_LINE}", answer=russian),
+        ))
+    elif theme_type == "numbers":
+        space.add("numbers", 1, *_pairs_both_ways(
+            data_pairs,
+            lambda num, ch_num: Exercise("write_number", f"Напиши по-китайски: {num} → {ANSWER_LINE}", answer=ch_num),
+            lambda num, ch_num: Exercise("read_number", f"Напиши цифру: {ch_num} → {ANSWER_LINE}", answer=str(num)),
+        ))
+    else:
+        space.add_items("task", 1, (
+            Exercise("task", f"Задание: {chinese} → {ANSWER_LINE}", answer=russian) for chinese, russian in data_pairs
+        ))
+    return space, None
+
+
+# ==================== ГЕНЕРАТОР УПРАЖНЕНИЙ ДЛЯ ВСЕХ ТЕМ ====================
+
+# Пространства тем с тем же пределом, что и у загруженных тем в ThemeStore:
+# вытесненная оттуда тема не остаётся жить здесь
+_spaces = OrderedDict()
+_spaces_lock = threading.Lock()
+
+
+def exercise_space(theme_config):
+    """Пространство упражнений темы и завершающее задание (или None).
+
+    Для тем из THEMES (с id) пространство строится один раз и дальше берётся из кэша:
+    после build его никто не меняет, так что его можно делить между потоками.
+    При перезагрузке темы THEMES отдаёт новый dict, поэтому кэш сверяет сам объект;
+    дата в ключе — из-за «Сегодня …» в теме «Дата».
+    """
+    theme_id = theme_config.get("id")
+    if theme_id is None:
+        return _build_space(theme_config)
+    today = date.today()
+    with _spaces_lock:
+        cached = _spaces.get(theme_id)
+        if cached is not None and cached[0] is theme_config and cached[1] == today:
+            _spaces.move_to_end(theme_id)
+            return cached[2]
+    result = _build_space(theme_config)
+    with _spaces_lock:
+        _spaces[theme_id] = (theme_config, today, result)
+        _spaces.move_to_end(theme_id)
+        while len(_spaces) > THEMES_CACHE_SIZE:
+            _spaces.popitem(last=False)
+    return result
+
+
+def _build_space(theme_config):
+    data_pairs = theme_config.get("pairs")
+    if data_pairs is None and "hsk" in theme_config:
+        # {"hsk": {"max_level": 3, "topic": "food"}} — слова прямо из базы HSK
+        data_pairs = load_vocabulary().pairs(**theme_config["hsk"])
+    if data_pairs is None:
+        raw_data = theme_config["data"]
+        data_pairs = [(k, v) for k, v in raw_data.items() if k and v and str(k).strip() and str(v).strip()]
+    if not data_pairs:
+        return ExerciseSpace(), None
+    builder = SPECIAL_SPACES.get(theme_config.get("name"), _universal_space)
+    return builder(theme_config, data_pairs)
+
+
+MAX_SEED = 999_999_999
+
+
+def new_seed():
+    return random.SystemRandom().randint(0, MAX_SEED)
+
+
+def iter_exercises(theme_config, count=15, allow_repeats=False, seed=None, student=None, record=True):
+    """Упражнения по одному: в памяти не держится весь список.
+
+    С student сначала идут упражнения, которых ученик (или класс) ещё не получал;
+    при record выданное записывается в историю, когда генератор исчерпан. Лист,
+    уже выданный ученику с этим seed, повторяется как был и историю не трогает,
+    а без record лист только показывается — как его выдали бы сейчас.
+    """
+    rng = random.Random(seed)
+    space, closing = exercise_space(theme_config)
+    if not space.size:
+        for i in range(1, count + 1):
+            yield Exercise("unavailable", f"{i}. Данные недоступны", answer="—")
+        return
+
+    seen = fingerprint = None
+    theme = theme_config.get("id") or theme_config.get("name")
+    if student:
+        source = theme_config.get("pairs") or theme_config.get("data") or theme_config.get("hsk")
+        fingerprint = space.fingerprint(theme_config.get("name"), source)
+        issued_with = HISTORY.sheet_seen(student, theme, seed, fingerprint) if seed is not None else None
+        if issued_with is not None:
+            seen, record = issued_with, False
+        else:
+            seen = HISTORY.seen(student, theme, fingerprint)
+
+    issued = []
+    sampled = count if closing is None else count - 1
+    for index, exercise in space.iter_sample_indexed(sampled, rng, allow_repeats, seen):
+        issued.append(index)
+        yield exercise
+    if closing is not None:
+        yield closing
+
+    if student and record:
+        HISTORY.record(student, theme, fingerprint, space.size, issued, seed, seen)
+
+
+def generate_exercises(theme_config, count=15, allow_repeats=False, seed=None, student=None, record=True):
+    """Упражнения без повторов; если тема столько не даёт, список будет короче count
+    (или с контролируемыми повторами при allow_repeats=True).
+
+    С одним и тем же seed получается тот же самый набор: у каждого вызова свой ГСЧ.
+    С student набор зависит ещё и от того, что ученик уже получал.
+    """
+    return list(iter_exercises(theme_config, count, allow_repeats, seed, student, record))
@@ -0,0 +1,76 @@
+# routes/fonts.py
+import os
+import threading
+from copy import copy, deepcopy
+from io import BytesIO
+
+from fontTools import ttLib
+from fpdf import FPDF
+from fpdf.fonts import SubsetMap, TTFFont
+
+FONT_FAMILY = "NotoSansTC"
+FONT_PATH = os.path.join(os.path.dirname(__file__), '..', 'fonts', 'NotoSansTC-Regular.ttf')
+
+_lock = threading.Lock()
+_font_bytes = None
+_prototype = None
+
+
+# ==================== ЗАГРУЗКА ШРИФТА (ОДИН РАЗ НА ПРОЦЕСС) ====================
+
+def load_fonts():
+    """Читает и разбирает шрифт один раз; повторные вызовы ничего не стоят"""
+    global _font_bytes, _prototype
+    if _prototype is not None:
+        return _prototype
+
+    with _lock:
+        if _prototype is None:
+            if not os.path.exists(FONT_PATH):
+                raise RuntimeError(f"Шрифт не найден: {FONT_PATH}")
+            with open(FONT_PATH, 'rb') as f:
+                _font_bytes = f.read()
+            # Разбор cmap и таблицы ширин глифов — самая дорогая часть add_font
+            _prototype = TTFFont(FPDF(), FONT_PATH, FONT_FAMILY.lower(), "")
+    return _prototype
+
+
+def _open_ttfont():
+    return ttLib.TTFont(BytesIO(_font_bytes), recalcTimestamp=False, fontNumber=0, lazy=True)
+
+
+def attach_font(pdf):
+    """Подключает уже разобранный шрифт к документу.
+
+    Общими остаются cmap, ширины и id глифов. Своими у документа будут
+    объект TTFont (fpdf подмножит и закроет его при output) и набор
+    использованных глифов.
+    """
+    prototype = load_fonts()
+    font = copy(prototype)
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = _open_ttfont()
+    font.desc = copy(prototype.desc)
+    font.missing_glyphs = []
+    font.subset = SubsetMap(font)
+    pdf.fonts[font.fontkey] = font
+    return font
+
+
+def clone_document(pdf):
+    """Копия недописанного документа: свёрстанное не верстается заново, дальше копии расходятся.
+
+    fpdf при deepcopy делит TTFont между копиями, а output() подмножит его на месте,
+    поэтому копии нужен собственный TTFont. Ширины и id глифов, наоборот, fpdf копирует
+    целиком (десятки тысяч записей), хотя они только читаются — их делим, как в attach_font.
+    """
+    font = pdf.fonts.get(FONT_FAMILY.lower())
+    memo = {}
+    if font is not None:
+        memo = {id(font.cw): font.cw, id(font.glyph_ids): font.glyph_ids}
+    clone = deepcopy(pdf, memo)
+    font = clone.fonts.get(FONT_FAMILY.lower())
+    if font is not None:
+        font.ttfont = _open_ttfont()
+        font.desc = copy(font.desc)
+    return clone
@@ -0,0 +1,113 @@
+# routes/grids.py
+import os
+import re
+
+from .pdf_output import define_form, place_form
+from .pinyin import to_pinyin
+
+MAX_GRID_CHARACTERS = int(os.environ.get("MAX_GRID_CHARACTERS", 200))
+
+CELL_MM = 15
+CELLS_PER_ROW = 12
+# Клетки после образца, где иероглиф напечатан бледно — по нему ученик обводит
+TRACE_CELLS = 3
+CAPTION_HEIGHT = 6
+ROW_GAP = 3
+
+TRACE_GRAY = 200
+
+_HAN = re.compile(r'[〇㐀-鿿豈-﫿]')
+
+
+def practice_characters(theme, limit=MAX_GRID_CHARACTERS):
+    """Иероглифы темы по порядку появления, без повторов (из ключей и значений data)"""
+    seen = {}
+    for key, value in theme["pairs"]:
+        for ch in _HAN.findall(f"{key}{value}"):
+            seen.setdefault(ch, None)
+            if len(seen) >= limit:
+                return list(seen)
+    return list(seen)
+
+
+# ==================== КЛЕТКА 田字格 ====================
+
+def _cell_ops(size):
+    """Рамка клетки и пунктирный крест посередине (операторы PDF, размер в пунктах)"""
+    half, dash, border = size / 2, size / 24, 0.6
+    return (
+        f"q 0.471 G {border} w {border / 2:.2f} {border / 2:.2f} {size - border:.2f} {size - border:.2f} re S "
+        f"0.725 G {border / 2} w [{dash:.2f} {dash:.2f}] 0 d "
+        f"0 {half:.2f} m {size:.2f} {half:.2f} l {half:.2f} 0 m {half:.2f} {size:.2f} l S Q"
+    )
+
+
+def _glyph_ops(pdf, ch, gray):
+    """Иероглиф текущим шрифтом по центру клетки; базовая линия — как у pdf.cell(align='C')"""
+    font, size_pt = pdf.current_font, pdf.font_size_pt
+    cell = CELL_MM * pdf.k
+    width = font.get_text_width(ch, size_pt, None)[1]
+    x, y = (cell - width) / 2, cell / 2 - 0.3 * size_pt
+    return f"BT /F{font.i} {size_pt:.2f} Tf {gray / 255:.3f} g {x:.2f} {y:.2f} Td {font.encode_text(ch)} ET"
+
+
+def _define_cell(pdf):
+    # Клетка описывается в документе один раз; каждая клетка на странице — ссылка на неё (Do)
+    define_form(pdf, "tianzige", CELL_MM, CELL_MM, _cell_ops(CELL_MM * pdf.k))
+    return "tianzige"
+
+
+def _define_trace(pdf, ch):
+    # Бледный иероглиф для обводки повторяется TRACE_CELLS раз — тоже одна форма на иероглиф.
+    # Знака нет в шрифте — рисовать нечего (образец в первой клетке fpdf выведет с предупреждением)
+    if ord(ch) not in pdf.current_font.glyph_ids:
+        return None
+    name = f"trace:{ch}"
+    define_form(pdf, name, CELL_MM, CELL_MM, _glyph_ops(pdf, ch, TRACE_GRAY))
+    return name
+
+
+# ==================== ВЁРСТКА ====================
+
+def _glyph(pdf, x, y, ch, gray):
+    pdf.set_text_color(gray, gray, gray)
+    pdf.set_xy(x, y)
+    pdf.cell(CELL_MM, CELL_MM, ch, align='C')
+
+
+def layout_practice_grid(pdf, title, characters, font_family):
+    """Строка клеток на иероглиф: образец, несколько бледных для обводки, остальные пустые"""
+    pdf.add_page()
+    cell = _define_cell(pdf)
+    pdf.set_font(font_family, size=16)
+    pdf.cell(pdf.epw, 10, title, new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(4)
+
+    cells = min(CELLS_PER_ROW, int(pdf.epw // CELL_MM))
+    row_height = CAPTION_HEIGHT + CELL_MM + ROW_GAP
+    glyph_size = CELL_MM * 0.72 / 25.4 * 72
+
+    for ch in characters:
+        if pdf.will_page_break(row_height):
+            pdf.add_page()
+            pdf.ln(2)
+        x, y = pdf.l_margin, pdf.get_y()
+
+        pdf.set_font(font_family, size=9)
+        pdf.set_text_color(110, 110, 110)
+        reading = to_pinyin(ch)
+        pdf.cell(pdf.epw, CAPTION_HEIGHT, f"{ch}  {reading}" if reading else ch)
+        y += CAPTION_HEIGHT
+
+        pdf.set_font(font_family, size=glyph_size)
+        trace = _define_trace(pdf, ch)
+        for k in range(cells):
+            cx = x + k * CELL_MM
+            place_form(pdf, cell, cx, y)
+            if k == 0:
+                _glyph(pdf, cx, y, ch, 0)
+            elif k <= TRACE_CELLS and trace:
+                place_form(pdf, trace, cx, y)
+
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_xy(x, y + CELL_MM + ROW_GAP)
@@ -0,0 +1,156 @@
+# routes/history.py
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+HISTORY_DIR = os.environ.get("HISTORY_DIR", os.path.join(tempfile.gettempdir(), "chinese_history"))
+MAX_STUDENT_LENGTH = 64
+# Сколько последних выданных листов на ученика и тему можно показать повторно
+MAX_SHEETS = int(os.environ.get("HISTORY_MAX_SHEETS", 50))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    student TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    seen BLOB NOT NULL,
+    cycles INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (student, theme)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sheets (
+    student TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    seen BLOB NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (student, theme, seed)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_student(student):
+    """Идентификатор ученика или класса без лишних пробелов и регистра; None, если пусто"""
+    student = ' '.join((student or '').split()).lower()
+    if len(student) > MAX_STUDENT_LENGTH:
+        raise ValueError(f"Идентификатор ученика длиннее {MAX_STUDENT_LENGTH} символов")
+    return student or None
+
+
+def set_bits(bitmap, ids):
+    for i in ids:
+        bitmap[i >> 3] |= 1 << (i & 7)
+    return bitmap
+
+
+def count_bits(bitmap):
+    return int.from_bytes(bitmap, 'little').bit_count()
+
+
+# ==================== ИСТОРИЯ УПРАЖНЕНИЙ УЧЕНИКОВ ====================
+
+class HistoryStore:
+    """Какие упражнения темы ученик уже получал: битовая карта по номерам в пространстве темы.
+
+    Номер упражнения — его место в ExerciseSpace, поэтому карта хранится вместе
+    с отпечатком пространства: если тема изменилась, история по ней начинается заново.
+    Когда ученик увидел всё, начинается новый круг.
+
+    Для выданного листа запоминается карта, с которой его тянули: по ней тот же
+    код листа даёт те же задания, и повторный показ историю не сдвигает.
+    """
+
+    def __init__(self, directory=HISTORY_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, "history.sqlite3")
+        self._local = threading.local()
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def seen(self, student, theme, fingerprint):
+        """Битовая карта уже выданных упражнений (пустая, если истории нет или тема изменилась)"""
+        row = self._db().execute(
+            "SELECT fingerprint, seen FROM history WHERE student = ? AND theme = ?", (student, theme)
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            return b''
+        return row[1]
+
+    def sheet_seen(self, student, theme, seed, fingerprint):
+        """Карта, с которой был выдан лист с этим кодом; None, если такого листа не выдавали"""
+        row = self._db().execute(
+            "SELECT fingerprint, seen FROM sheets WHERE student = ? AND theme = ? AND seed = ?",
+            (student, theme, seed),
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            return None
+        return row[1]
+
+    def record(self, student, theme, fingerprint, size, ids, seed=None, seen=b''):
+        """Отмечает выданные упражнения; если отмечено всё пространство — начинается новый круг.
+
+        С seed запоминается и сам лист: seen — карта, по которой его тянули.
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT fingerprint, seen, cycles FROM history WHERE student = ? AND theme = ?", (student, theme)
+            ).fetchone()
+            cycles = 0
+            bitmap = bytearray((size + 7) // 8)
+            if row is not None and row[0] == fingerprint:
+                bitmap[:len(row[1])] = row[1]
+                cycles = row[2]
+            set_bits(bitmap, ids)
+            if count_bits(bitmap) >= size:
+                bitmap = set_bits(bytearray(len(bitmap)), ids) if len(ids) < size else bytearray(len(bitmap))
+                cycles += 1
+            db.execute(
+                "INSERT OR REPLACE INTO history (student, theme, fingerprint, seen, cycles, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (student, theme, fingerprint, bytes(bitmap), cycles, time.time()),
+            )
+            if seed is not None:
+                self._add_sheet(db, student, theme, seed, fingerprint, seen)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _add_sheet(self, db, student, theme, seed, fingerprint, seen):
+        db.execute(
+            "INSERT OR REPLACE INTO sheets (student, theme, seed, fingerprint, seen, created)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (student, theme, seed, fingerprint, bytes(seen or b''), time.time()),
+        )
+        db.execute(
+            "DELETE FROM sheets WHERE student = ? AND theme = ? AND seed NOT IN"
+            " (SELECT seed FROM sheets WHERE student = ? AND theme = ? ORDER BY created DESC LIMIT ?)",
+            (student, theme, student, theme, MAX_SHEETS),
+        )
+
+    def forget(self, student, theme=None):
+        for table in ("history", "sheets"):
+            if theme is None:
+                self._db().execute(f"DELETE FROM {table} WHERE student = ?", (student,))
+            else:
+                self._db().execute(f"DELETE FROM {table} WHERE student = ? AND theme = ?", (student, theme))
+
+
+HISTORY = HistoryStore()
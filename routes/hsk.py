@@ -0,0 +1,184 @@
+# routes/hsk.py
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+from collections import namedtuple
+
+HSK_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'hsk')
+WORDS_PATH = os.path.join(HSK_DIR, 'words.tsv')
+HSK_DB_PATH = os.environ.get("HSK_DB_PATH", os.path.join(HSK_DIR, 'hsk.sqlite3'))
+
+HSK_LEVELS = range(1, 7)
+# Уровни, которые в words.tsv есть лишь выборкой (слова к темам уроков), а не полным списком
+PARTIAL_LEVELS = frozenset({3})
+
+SCHEMA = """
+CREATE TABLE words (
+    id INTEGER PRIMARY KEY,
+    hanzi TEXT NOT NULL UNIQUE,
+    pinyin TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    topics TEXT NOT NULL,
+    gloss TEXT NOT NULL
+);
+CREATE INDEX words_level ON words (level);
+CREATE TABLE word_topics (
+    topic TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    word_id INTEGER NOT NULL,
+    PRIMARY KEY (topic, level, word_id)
+) WITHOUT ROWID;
+"""
+
+Word = namedtuple('Word', 'hanzi pinyin level topics gloss')
+
+_lock = threading.Lock()
+_vocabulary = None
+
+
+# ==================== СБОРКА БАЗЫ ИЗ TSV ====================
+
+def read_words(path=WORDS_PATH):
+    """Слова из TSV: иероглифы, пиньинь, уровень, темы через запятую, перевод"""
+    words = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            hanzi, pinyin, level, topics, gloss = line.split('\t')
+            words.append(Word(hanzi, pinyin, int(level), tuple(topics.split(',')), gloss))
+    return words
+
+
+def build_database(source=WORDS_PATH, target=HSK_DB_PATH):
+    """Собирает SQLite-базу во временный файл и атомарно подменяет ею старую"""
+    words = read_words(source)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    os.close(fd)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            for word_id, word in enumerate(words, 1):
+                conn.execute(
+                    "INSERT INTO words (id, hanzi, pinyin, level, topics, gloss) VALUES (?, ?, ?, ?, ?, ?)",
+                    (word_id, word.hanzi, word.pinyin, word.level, ','.join(word.topics), word.gloss),
+                )
+                conn.executemany(
+                    "INSERT INTO word_topics (topic, level, word_id) VALUES (?, ?, ?)",
+                    [(topic, word.level, word_id) for topic in word.topics],
+                )
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp, target)
+    return len(words)
+
+
+# ==================== ЗАПРОСЫ ====================
+
+class Vocabulary:
+    """Словарь HSK только для чтения; у каждого потока (и процесса) своё соединение"""
+
+    def __init__(self, path=HSK_DB_PATH):
+        self.path = os.path.abspath(path)
+        self._local = threading.local()
+        self._levels = None
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # immutable=1: файл не меняется, SQLite не берёт блокировки и не проверяет журнал
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def levels(self):
+        """Уровни, которые есть во встроенном словаре, по возрастанию"""
+        if self._levels is None:
+            rows = self._db().execute("SELECT DISTINCT level FROM words ORDER BY level").fetchall()
+            self._levels = tuple(level for level, in rows)
+        return self._levels
+
+    def _check_levels(self, max_level, min_level):
+        """max_level по умолчанию — старший уровень словаря; уровня, которого нет, — ValueError"""
+        bundled = self.levels()
+        if max_level is None:
+            max_level = bundled[-1]
+        if min_level not in HSK_LEVELS or max_level not in HSK_LEVELS or min_level > max_level:
+            raise ValueError(f"Неверные уровни HSK: {min_level}–{max_level} (бывают 1–6)")
+        missing = [level for level in range(min_level, max_level + 1) if level not in bundled]
+        if missing:
+            raise ValueError(
+                f"Уровня HSK {', '.join(map(str, missing))} нет во встроенном словаре "
+                f"(есть {', '.join(map(str, bundled))})"
+            )
+        return max_level, min_level
+
+    def words(self, max_level=None, min_level=1, topic=None):
+        """Слова уровней min_level..max_level (по умолчанию — до старшего уровня словаря).
+
+        topic — тема или список тем. Уровни из PARTIAL_LEVELS представлены выборкой;
+        уровень, которого в словаре нет, — ValueError, а не молча неполный ответ.
+        """
+        max_level, min_level = self._check_levels(max_level, min_level)
+        if topic is None:
+            rows = self._db().execute(
+                "SELECT hanzi, pinyin, level, topics, gloss FROM words"
+                " WHERE level BETWEEN ? AND ? ORDER BY id",
+                (min_level, max_level),
+            )
+        else:
+            topics = [topic] if isinstance(topic, str) else list(topic)
+            rows = self._db().execute(
+                "SELECT hanzi, pinyin, level, topics, gloss FROM words WHERE id IN ("
+                f" SELECT word_id FROM word_topics WHERE topic IN ({','.join('?' * len(topics))})"
+                " AND level BETWEEN ? AND ?) ORDER BY id",
+                (*topics, min_level, max_level),
+            )
+        return [Word(h, p, lvl, tuple(t.split(',')), g) for h, p, lvl, t, g in rows]
+
+    def sample(self, count, max_level=None, min_level=1, topic=None, rng=random):
+        """Например, sample(20, max_level=3, topic='food'): 20 случайных слов без повторов"""
+        words = self.words(max_level, min_level, topic)
+        return rng.sample(words, min(count, len(words)))
+
+    def pairs(self, max_level=None, min_level=1, topic=None):
+        """Пары (иероглифы, перевод) в том виде, в каком их ждёт генератор упражнений"""
+        return tuple((w.hanzi, w.gloss) for w in self.words(max_level, min_level, topic))
+
+    def lookup(self, hanzi):
+        row = self._db().execute(
+            "SELECT hanzi, pinyin, level, topics, gloss FROM words WHERE hanzi = ?", (hanzi,)
+        ).fetchone()
+        return None if row is None else Word(row[0], row[1], row[2], tuple(row[3].split(',')), row[4])
+
+    def topics(self):
+        """Темы и число слов в каждой"""
+        return self._db().execute(
+            "SELECT topic, COUNT(*) FROM word_topics GROUP BY topic ORDER BY topic"
+        ).fetchall()
+
+
+def _is_stale(target, source):
+    try:
+        return os.stat(target).st_mtime_ns < os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return True
+
+
+def load_vocabulary():
+    """База один раз на процесс; если её нет или TSV новее — собирается заново"""
+    global _vocabulary
+    if _vocabulary is not None:
+        return _vocabulary
+    with _lock:
+        if _vocabulary is None:
+            if _is_stale(HSK_DB_PATH, WORDS_PATH):
+                build_database()
+            _vocabulary = Vocabulary()
+    return _vocabulary
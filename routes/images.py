@@ -0,0 +1,91 @@
+# routes/images.py
+import os
+import threading
+from copy import copy
+from io import BytesIO
+
+from fpdf.image_parsing import get_img_info
+from PIL import Image
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), '..', 'static', 'images')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Ширина печатной области A4 с полями ChinesePDF (210 − 15 − 15 мм)
+PRINT_WIDTH_MM = 180
+TARGET_DPI = int(os.environ.get("PDF_IMAGE_DPI", 120))
+JPEG_QUALITY = int(os.environ.get("PDF_IMAGE_QUALITY", 85))
+
+_lock = threading.Lock()
+_prepared = {}
+
+
+# ==================== ПОДГОТОВКА КАРТИНОК (ОДИН РАЗ НА ПРОЦЕСС) ====================
+
+def _has_alpha(img):
+    if img.mode in ('RGBA', 'LA'):
+        return img.getextrema()[-1][0] < 255
+    return img.mode == 'P' and 'transparency' in img.info
+
+
+def _encode(img, width_mm):
+    max_px = round(width_mm / 25.4 * TARGET_DPI)
+    if img.width > max_px:
+        img = img.resize((max_px, round(img.height * max_px / img.width)), Image.LANCZOS)
+    img.info.pop('icc_profile', None)
+
+    if _has_alpha(img):
+        # Прозрачность JPEG не умеет — оставляем растр, fpdf сожмёт его deflate
+        return img.convert('RGBA')
+
+    out = BytesIO()
+    img.convert('RGB').save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    out.seek(0)
+    return out
+
+
+def prepare_image(path, width_mm=PRINT_WIDTH_MM):
+    """Уменьшает картинку до печатной ширины и готовит данные для встраивания в PDF"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size, width_mm, TARGET_DPI)
+    cached = _prepared.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with Image.open(path) as img:
+        img.load()
+        encoded = _encode(img, width_mm)
+    info = get_img_info(path, encoded)
+
+    with _lock:
+        _prepared[path] = (signature, info)
+    return info
+
+
+def preload_folder(folder=IMAGES_DIR):
+    """Готовит все картинки папки и её подпапок (например, static/images/family)"""
+    count = 0
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                prepare_image(os.path.join(root, name))
+                count += 1
+    return count
+
+
+def embed_prepared(pdf, name, info, **kwargs):
+    """Размещает подготовленную картинку; повторные вызовы ссылаются на тот же объект в PDF"""
+    images = pdf.image_cache.images
+    if name not in images:
+        # Данные картинки общие; счётчики и номер объекта у каждого документа свои
+        doc_info = copy(info)
+        doc_info["i"] = len(images) + 1
+        doc_info["usages"] = 0
+        doc_info["iccp_i"] = None
+        images[name] = doc_info
+    return pdf.image(name, **kwargs)
+
+
+def embed_image(pdf, path, **kwargs):
+    """Аналог pdf.image(path, ...), но с уже подготовленными данными картинки"""
+    return embed_prepared(pdf, f"prepared:{os.path.abspath(path)}", prepare_image(path), **kwargs)
@@ -0,0 +1,194 @@
+# routes/jobs.py
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+JOBS_DIR = os.environ.get("JOBS_DIR", os.path.join(tempfile.gettempdir(), "chinese_jobs"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+# Задание в статусе running дольше этого срока считается брошенным (воркер перезапущен)
+JOB_STALE_AFTER = int(os.environ.get("JOB_STALE_AFTER", 300))
+# Готовые PDF и записи о заданиях хранятся сутки
+JOB_TTL = int(os.environ.get("JOB_TTL", 24 * 3600))
+
+# Пауза после ошибки базы: удваивается при повторных ошибках, но не больше JOB_MAX_BACKOFF
+JOB_MAX_BACKOFF = 30
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+"""
+
+
+# ==================== ОЧЕРЕДЬ ЗАДАНИЙ НА SQLITE ====================
+
+class JobQueue:
+    """Очередь в локальном SQLite-файле: переживает перезапуск воркеров"""
+
+    def __init__(self, directory=JOBS_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        self._local = threading.local()
+        self._finished = threading.Condition()
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+        self._last_cleanup = 0
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def result_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.pdf")
+
+    def submit(self, **params):
+        job_id = uuid.uuid4().hex
+        self._db().execute(
+            "INSERT INTO jobs (id, status, params, created) VALUES (?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(params, ensure_ascii=False), time.time()),
+        )
+        self.notify()
+        return job_id
+
+    def get(self, job_id):
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def wait(self, job_id, timeout):
+        """Долгий опрос: ждёт завершения задания не дольше timeout секунд"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in (DONE, FAILED) or remaining <= 0:
+                return job
+            # Задание могут доделать в другом процессе, поэтому ждём с периодической проверкой базы
+            with self._finished:
+                self._finished.wait(min(remaining, 0.5))
+
+    def claim(self):
+        """Забирает самое старое задание из очереди (или брошенное другим воркером)"""
+        conn = self._db()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? OR (status = ? AND started < ?) "
+                "ORDER BY created LIMIT 1",
+                (QUEUED, RUNNING, now - JOB_STALE_AFTER),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = ?, started = ? WHERE id = ?", (RUNNING, now, row["id"]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    def _finish(self, job_id, status, error=None):
+        self._db().execute(
+            "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+            (status, error, time.time(), job_id),
+        )
+        with self._finished:
+            self._finished.notify_all()
+
+    def complete(self, job_id, data):
+        # Пишем во временный файл и переименовываем, чтобы не отдать недописанный PDF
+        path = self.result_path(job_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._finish(job_id, DONE)
+
+    def fail(self, job_id, error):
+        self._finish(job_id, FAILED, error)
+
+    def cleanup(self):
+        cutoff = time.time() - JOB_TTL
+        conn = self._db()
+        expired = conn.execute("SELECT id FROM jobs WHERE created < ?", (cutoff,)).fetchall()
+        for row in expired:
+            try:
+                os.remove(self.result_path(row["id"]))
+            except FileNotFoundError:
+                pass
+        conn.execute("DELETE FROM jobs WHERE created < ?", (cutoff,))
+
+    # ---------- фоновые воркеры ----------
+
+    def ensure_workers(self, render):
+        """Запускает фоновые потоки в текущем процессе (после fork — заново)"""
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            for n in range(JOB_WORKERS):
+                threading.Thread(
+                    target=self._work, args=(render,), name=f"pdf-job-worker-{n}", daemon=True
+                ).start()
+            self._started_pid = os.getpid()
+
+    def _work(self, render):
+        # Ошибка SQLite (например, «database is locked» после таймаута) не должна убивать поток:
+        # перезапускать его некому, и задания так и остались бы в очереди
+        backoff = 1
+        while True:
+            try:
+                self._work_once(render)
+                backoff = 1
+            except Exception:
+                logger.exception("Воркер заданий: ошибка, повтор через %d с", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, JOB_MAX_BACKOFF)
+
+    def _work_once(self, render):
+        if time.time() - self._last_cleanup > 3600:
+            self._last_cleanup = time.time()
+            self.cleanup()
+
+        job = self.claim()
+        if job is None:
+            with self._finished:
+                self._finished.wait(1)
+            return
+        try:
+            data = render(**job["params"])
+        except Exception as e:
+            self.fail(job["id"], f"{type(e).__name__}: {e}")
+        else:
+            self.complete(job["id"], data)
+
+    def notify(self):
+        with self._finished:
+            self._finished.notify_all()
@@ -0,0 +1,218 @@
+# routes/metrics.py
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288, 1048576, 4194304)
+
+# Тема текущего запроса: её подставляют в метки этапов, которые глубоко в коде генерации
+_current_theme = ContextVar('current_theme', default='')
+# Время, которое внутри текущего этапа ушло на вложенный timed_iter: этап его не учитывает
+_nested_seconds = ContextVar('nested_seconds', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+# ==================== ТИПЫ МЕТРИК ====================
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, labels
+        # Метрика без меток видна в выдаче сразу, а не после первого изменения
+        self._values = {} if labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def samples(self):
+        if self.callback is not None:
+            yield self.name, '', self.callback()
+        else:
+            yield from super().samples()
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=SECONDS_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(k, (list(counts), total)) for k, (counts, total) in self._values.items()]
+        for label_values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(self.labels, label_values, [('le', bound)]), cumulative
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum", labels, round(total, 6)
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Текстовый формат Prometheus; всё считается только в момент опроса"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+# ==================== МЕТРИКИ ПРИЛОЖЕНИЯ ====================
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "chinese_pdf_requests_total", "Запросы на выдачу PDF", ("endpoint", "theme")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "chinese_pdf_request_seconds", "Полное время обработки запроса на PDF", ("endpoint", "theme")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "chinese_pdf_stage_seconds", "Время этапов генерации PDF", ("stage", "theme")))
+PDF_BYTES = REGISTRY.register(Histogram(
+    "chinese_pdf_bytes", "Размер отданного PDF", ("endpoint", "theme"), BYTES_BUCKETS))
+PDF_SECTION_BYTES = REGISTRY.register(Histogram(
+    "chinese_pdf_section_bytes", "Размер разделов PDF: шрифты, картинки, текст страниц, прочее",
+    ("section",), BYTES_BUCKETS))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "chinese_pdf_renders_in_flight", "PDF, которые сейчас верстаются"))
+
+
+@contextmanager
+def track_request(endpoint, theme):
+    """Считает запрос, его длительность и задаёт тему для меток вложенных этапов"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    token = _current_theme.set(theme)
+    REQUESTS.inc(endpoint, theme)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, theme)
+        _current_theme.reset(token)
+
+
+@contextmanager
+def stage(name):
+    if not METRICS_ENABLED:
+        yield
+        return
+    nested = [0.0]
+    token = _nested_seconds.set(nested)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _nested_seconds.reset(token)
+        STAGE_SECONDS.observe(elapsed - nested[0], name, _current_theme.get())
+
+
+def timed_iter(name, iterable):
+    """Ленивый iterable, время в next() которого идёт в отдельный этап name.
+
+    Так генерацию, которая расходуется прямо во время вёрстки, видно отдельно от layout.
+    """
+    if not METRICS_ENABLED:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    spent = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds = time.perf_counter() - started
+                spent += seconds
+                outer = _nested_seconds.get()
+                if outer is not None:
+                    outer[0] += seconds
+            yield item
+    finally:
+        STAGE_SECONDS.observe(spent, name, _current_theme.get())
+
+
+@contextmanager
+def rendering():
+    if not METRICS_ENABLED:
+        yield
+        return
+    IN_FLIGHT.inc()
+    try:
+        yield
+    finally:
+        IN_FLIGHT.dec()
+
+
+def observe_pdf_size(endpoint, size):
+    if METRICS_ENABLED:
+        PDF_BYTES.observe(size, endpoint, _current_theme.get())
+
+
+def observe_pdf_sections(sizes):
+    if METRICS_ENABLED:
+        for section, size in sizes.items():
+            PDF_SECTION_BYTES.observe(size, section)
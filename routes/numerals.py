@@ -0,0 +1,137 @@
+# routes/numerals.py
+from functools import lru_cache
+
+DIGITS = '零一二三四五六七八九'
+FINANCIAL_DIGITS = '零壹贰叁肆伍陆柒捌玖'
+SMALL_UNITS = ('', '十', '百', '千')
+FINANCIAL_SMALL_UNITS = ('', '拾', '佰', '仟')
+# Разряды по 10⁴: 万 = 10⁴, 亿 = 10⁸, 万亿 = 10¹²
+BIG_UNITS = ('', '万', '亿', '万亿')
+
+MAX_NUMBER = 10 ** (4 * len(BIG_UNITS)) - 1
+
+PLAIN = 'plain'
+LIANG = 'liang'
+FINANCIAL = 'financial'
+
+# Обратный перевод: значения знаков, включая 两, 〇, финансовые и традиционные формы
+_DIGIT_VALUES = {ch: i for i, ch in enumerate(DIGITS)}
+_DIGIT_VALUES.update({ch: i for i, ch in enumerate(FINANCIAL_DIGITS)})
+_DIGIT_VALUES.update({'〇': 0, '两': 2, '兩': 2})
+_UNIT_VALUES = {'十': 10, '百': 100, '千': 1000, '拾': 10, '佰': 100, '仟': 1000}
+_BIG_VALUES = {'万': 10 ** 4, '萬': 10 ** 4, '亿': 10 ** 8, '億': 10 ** 8}
+
+
+# ==================== ЧИСЛО → ИЕРОГЛИФЫ ====================
+
+@lru_cache(maxsize=None)
+def _section(value, style, before_big_unit):
+    """Запись 1–9999 внутри одного разряда 万; результаты запоминаются (не больше 10⁴ на стиль)"""
+    financial = style == FINANCIAL
+    digits = FINANCIAL_DIGITS if financial else DIGITS
+    units = FINANCIAL_SMALL_UNITS if financial else SMALL_UNITS
+
+    parts = []
+    zero = False
+    for pos in (3, 2, 1, 0):
+        d = value // 10 ** pos % 10
+        if d == 0:
+            zero = bool(parts)
+            continue
+        if zero:
+            parts.append(digits[0])
+            zero = False
+        char = digits[d]
+        # 两 перед 百/千, а одиночная двойка — перед 万/亿: 两百, 两千, 两万
+        if style == LIANG and d == 2 and (pos >= 2 or (pos == 0 and value == 2 and before_big_unit)):
+            char = '两'
+        parts.append(char + units[pos])
+    return ''.join(parts)
+
+
+def to_chinese(num, style=PLAIN):
+    """Целое число китайскими цифрами.
+
+    style: PLAIN — 二百二十, LIANG — 两百二十 (разговорная форма),
+    FINANCIAL — 贰佰贰拾 (大写, для денежных сумм).
+    """
+    if not -MAX_NUMBER <= num <= MAX_NUMBER:
+        raise ValueError(f"Число вне диапазона: {num}")
+    if num == 0:
+        return DIGITS[0]
+    if num < 0:
+        return '负' + to_chinese(-num, style)
+
+    sections = []
+    while num:
+        num, section = divmod(num, 10000)
+        sections.append(section)
+
+    parts = []
+    pending_zero = False
+    for k in range(len(sections) - 1, -1, -1):
+        section = sections[k]
+        if section == 0:
+            pending_zero = bool(parts)
+            continue
+        # Пропущенный разряд или «неполный» разряд после старшего даёт один 零: 一万零五, 一亿零一
+        if parts and (pending_zero or section < 1000):
+            parts.append(DIGITS[0])
+        pending_zero = False
+        parts.append(_section(section, style, style == LIANG and k > 0) + BIG_UNITS[k])
+
+    text = ''.join(parts)
+    # 10–19 в начале числа читаются без 一: 十五, 十万; в 大写 единица пишется всегда
+    if style != FINANCIAL and text.startswith('一十'):
+        text = text[1:]
+    return text
+
+
+def to_chinese_many(numbers, style=PLAIN):
+    """Пакетный перевод: разряды берутся из общего кэша, так что сотни чисел стоят копейки"""
+    return [to_chinese(num, style) for num in numbers]
+
+
+def chinese_range(start, stop, style=PLAIN):
+    """Словарь число → запись для range(start, stop)"""
+    numbers = range(start, stop)
+    return dict(zip(numbers, to_chinese_many(numbers, style)))
+
+
+# ==================== ИЕРОГЛИФЫ → ЧИСЛО ====================
+
+def from_chinese(text):
+    """Обратный перевод: 三万零五 → 30005, 两千 → 2000, 贰佰 → 200, 二〇二四 → 2024"""
+    text = text.strip()
+    sign = 1
+    if text[:1] in ('负', '負'):
+        sign, text = -1, text[1:]
+    if not text:
+        raise ValueError("Пустая запись числа")
+
+    # Запись без разрядов (二〇二四) — просто цифры подряд
+    if all(ch in _DIGIT_VALUES for ch in text):
+        value = 0
+        for ch in text:
+            value = value * 10 + _DIGIT_VALUES[ch]
+        return sign * value
+
+    total = section = number = 0
+    for ch in text:
+        if ch in _DIGIT_VALUES:
+            number = _DIGIT_VALUES[ch]
+        elif ch in _UNIT_VALUES:
+            # 十 без цифры перед ним — это 一十
+            section += (number or 1) * _UNIT_VALUES[ch]
+            number = 0
+        elif ch in _BIG_VALUES:
+            if _BIG_VALUES[ch] == 10 ** 4:
+                section = (section + number) * 10 ** 4
+            else:
+                # 亿 умножает всё, что накоплено после предыдущего 亿: 一万亿 = 10¹²
+                total += (section + number) * 10 ** 8
+                section = 0
+            number = 0
+        else:
+            raise ValueError(f"Не китайское число: {text}")
+    return sign * (total + section + number)
@@ -0,0 +1,96 @@
+# routes/pages.py
+import gzip
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+from flask import Response, request, url_for
+
+from .cache import file_digest
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём gzip
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), '..', 'static')
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+CachedPage = namedtuple('CachedPage', 'key etag variants')
+
+
+# ==================== ГОТОВЫЕ HTML-СТРАНИЦЫ ====================
+
+def _compress(data):
+    variants = {'identity': data, 'gzip': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+class PageCache:
+    """Страницы, отрендеренные один раз и сжатые заранее; пересобираются при смене ключа"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, name, key, build):
+        entry = self._entries.get(name)
+        if entry is not None and entry.key == key:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.key != key:
+                data = build().encode('utf-8')
+                entry = CachedPage(key, hashlib.sha256(data).hexdigest()[:32], _compress(data))
+                self._entries[name] = entry
+        return entry
+
+
+def send_page(page):
+    """Ответ с подходящим сжатием; на совпавший If-None-Match — 304 без тела"""
+    encoding = 'identity'
+    for candidate in ('br', 'gzip'):
+        if candidate in page.variants and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+
+    response = Response(page.variants[encoding], mimetype='text/html')
+    # У каждого варианта сжатия свои байты, значит и свой сильный ETag
+    response.set_etag(page.etag if encoding == 'identity' else f"{page.etag}-{encoding}")
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+# ==================== СТАТИКА С ОТПЕЧАТКОМ ====================
+
+def static_version(filename):
+    return file_digest(os.path.join(STATIC_DIR, filename))[:12]
+
+
+def static_url(filename):
+    """URL статического файла с хэшем содержимого: такой URL можно кэшировать навсегда"""
+    return url_for('static', filename=filename, v=static_version(filename))
+
+
+def cache_versioned_static(response):
+    """after_request: ответы на URL с отпечатком браузер кэширует без перепроверки.
+
+    Только если отпечаток совпадает с нынешним содержимым файла: устаревший или выдуманный v
+    получает обычные заголовки с перепроверкой, иначе старый CSS застрял бы в кэше на год.
+    """
+    if request.endpoint != 'static' or response.status_code != 200:
+        return response
+    filename = (request.view_args or {}).get('filename')
+    if filename and request.args.get('v') == static_version(filename):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,149 @@
+# routes/pdf_output.py
+import hashlib
+import logging
+import zlib
+
+from fontTools import subset as ftsubset
+from fpdf.output import OutputProducer
+from fpdf.syntax import Name, PDFArray, PDFContentStream
+from fpdf.syntax import create_dictionary_string as pdf_dict
+from fpdf.syntax import iobj_ref as pdf_ref
+
+logger = logging.getLogger(__name__)
+# fontTools пишет каждый шаг подмножества в INFO — в логе сервера это шум на каждый PDF
+logging.getLogger("fontTools.subset").setLevel(logging.WARNING)
+
+# Потоки, которые fpdf пишет как есть (например, ToUnicode у шрифта), сжимаем сами
+COMPRESSION_LEVEL = 9
+
+# Разделы, на которые fpdf размечает объекты при записи (страницы — это наш текст и разметка);
+# всё остальное — «прочее»
+SECTIONS = {"fonts": "fonts", "images": "images", "content": "pages"}
+
+
+# ==================== ФОРМЫ (FORM XOBJECT) ====================
+
+class PDFFormXObject(PDFContentStream):
+    """Векторный фрагмент, описанный в документе один раз; страницы рисуют его оператором Do"""
+
+    def __init__(self, contents, width, height):
+        super().__init__(contents=contents)
+        self.type = Name("XObject")
+        self.subtype = Name("Form")
+        self.b_box = PDFArray([0, 0, round(width, 2), round(height, 2)])
+        self.resources = None
+
+
+def define_form(pdf, name, width, height, contents):
+    """Регистрирует форму в документе (размер в мм, операторы — в пунктах от левого нижнего угла).
+
+    Повторный вызов с тем же именем ничего не делает. Возвращает имя ресурса формы.
+    """
+    forms = getattr(pdf, "form_xobjects", None)
+    if forms is None:
+        forms = pdf.form_xobjects = {}
+    if name not in forms:
+        forms[name] = (f"Fm{len(forms) + 1}", width * pdf.k, height * pdf.k, contents)
+    return forms[name][0]
+
+
+def place_form(pdf, name, x, y):
+    """Рисует уже определённую форму так, что её левый верхний угол — в (x, y) мм"""
+    resource, _, height, _ = pdf.form_xobjects[name]
+    pdf._out(f"q 1 0 0 1 {x * pdf.k:.2f} {pdf.h_pt - y * pdf.k - height:.2f} cm /{resource} Do Q")
+
+
+# ==================== ОПТИМИЗАЦИЯ ВЫВОДА PDF ====================
+
+def _deflate(stream):
+    data = stream.content_stream()
+    if isinstance(data, str):
+        data = data.encode('latin-1')
+    stream._contents = zlib.compress(data, COMPRESSION_LEVEL)
+    stream.filter = Name("FlateDecode")
+    stream.length = len(stream._contents)
+
+
+def _strip_font(font):
+    """Подмножество без хинтинга: на печати и в просмотрщиках он не нужен, а весит много.
+
+    fpdf потом подмножит шрифт ещё раз теми же глифами — это уже дёшево.
+    """
+    options = ftsubset.Options(notdef_outline=True, recommended_glyphs=True)
+    options.hinting = False
+    options.desubroutinize = True
+    options.drop_tables += ["FFTM", "GDEF", "GPOS", "GSUB", "MATH", "hdmx", "meta", "DSIG"]
+    subsetter = ftsubset.Subsetter(options)
+    subsetter.populate(glyphs=font.subset.get_all_glyph_names())
+    subsetter.subset(font.ttfont)
+
+
+def _image_key(info):
+    smask = info.get("smask")
+    return (
+        hashlib.sha1(info["data"]).digest(),
+        hashlib.sha1(smask).digest() if smask is not None else None,
+        info["w"], info["h"], info["cs"], info["bpc"], info["f"],
+    )
+
+
+class OptimizingOutputProducer(OutputProducer):
+    """OutputProducer fpdf плюс: шрифт без хинтинга, все потоки в deflate,
+    одинаковые картинки — один объект, формы из define_form — в ресурсах XObject,
+    размер по разделам — в pdf.size_breakdown.
+    """
+
+    def _add_pdf_obj(self, pdf_obj, trace_label=None):
+        if type(pdf_obj) in (PDFContentStream, PDFFormXObject) and pdf_obj.filter is None:
+            _deflate(pdf_obj)
+        return super()._add_pdf_obj(pdf_obj, trace_label)
+
+    def _add_fonts(self):
+        for font in self.fpdf.fonts.values():
+            if font.type == "TTF":
+                _strip_font(font)
+        self._font_objs = super()._add_fonts()
+        return self._font_objs
+
+    def _add_images(self):
+        # Одна и та же картинка под разными именами (другой путь, другой размер в вёрстке) встраивается один раз
+        img_objs_per_index, objs_per_key = {}, {}
+        for img in sorted(self.fpdf.image_cache.images.values(), key=lambda img: img["i"]):
+            if img["usages"] > 0:
+                key = _image_key(img)
+                if key not in objs_per_key:
+                    objs_per_key[key] = self._add_image(img)
+                img_objs_per_index[img["i"]] = objs_per_key[key]
+        self._form_objs = self._add_forms()
+        return img_objs_per_index
+
+    def _add_forms(self):
+        forms = getattr(self.fpdf, "form_xobjects", None)
+        if not forms:
+            return {}
+        # Формам нужны только шрифты (текст в них — глифы уже подмноженного шрифта)
+        fonts = pdf_dict({
+            f"/F{index}": pdf_ref(font_obj.id) for index, font_obj in sorted(self._font_objs.items())
+        })
+        form_objs = {}
+        for resource, width, height, contents in forms.values():
+            form_obj = PDFFormXObject(contents.encode('latin-1'), width, height)
+            form_obj.resources = pdf_dict({"/Font": fonts})
+            self._add_pdf_obj(form_obj, "pages")
+            form_objs[resource] = form_obj
+        return form_objs
+
+    def _add_resources_dict(self, font_objs_per_index, img_objs_per_index, *args):
+        resources_obj = super()._add_resources_dict(font_objs_per_index, img_objs_per_index, *args)
+        form_objs = getattr(self, "_form_objs", None)
+        if form_objs:
+            x_objects = {f"/I{index}": pdf_ref(img_obj.id) for index, img_obj in sorted(img_objs_per_index.items())}
+            x_objects.update({f"/{resource}": pdf_ref(form_obj.id) for resource, form_obj in form_objs.items()})
+            resources_obj.x_object = pdf_dict(x_objects)
+        return resources_obj
+
+    def _log_final_sections_sizes(self):
+        sizes = {name: self.sections_size_per_trace_label.get(label, 0) for name, label in SECTIONS.items()}
+        sizes["other"] = len(self.buffer) - sum(sizes.values())
+        self.fpdf.size_breakdown = sizes
+        logger.debug("Размер PDF по разделам: %s", sizes)
@@ -0,0 +1,156 @@
+# routes/pinyin.py
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+
+from markupsafe import Markup, escape
+
+from .hsk import WORDS_PATH, read_words
+
+PINYIN_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'pinyin')
+DICTIONARY_PATH = os.path.join(PINYIN_DIR, 'dictionary.tsv')
+INDEX_PATH = os.environ.get("PINYIN_INDEX_PATH", os.path.join(PINYIN_DIR, 'dictionary.idx'))
+
+# Заголовок: сигнатура, число слов, длина самого длинного слова (в символах)
+_HEADER = struct.Struct('<4sII')
+# Запись: смещение и длина слова, смещение и длина чтения (UTF-8, от начала файла)
+_RECORD = struct.Struct('<IHIH')
+_MAGIC = b'PYX1'
+
+_HAN = re.compile(r'[〇㐀-鿿豈-﫿]+')
+
+_lock = threading.Lock()
+_index = None
+
+
+# ==================== СБОРКА ИНДЕКСА ====================
+
+def read_dictionary(path=DICTIONARY_PATH):
+    entries = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            word, reading = line.split('\t', 1)
+            entries[word] = reading
+    return entries
+
+
+def build_index(source=DICTIONARY_PATH, target=INDEX_PATH):
+    """Компилирует TSV (плюс слова HSK) в отсортированный двоичный индекс; файл заменяется атомарно"""
+    dictionary = {word.hanzi: word.pinyin for word in read_words(WORDS_PATH)}
+    # Собственный словарь точнее: в нём многозначные иероглифы и лёгкие тоны разобраны под наши темы
+    dictionary.update(read_dictionary(source))
+    entries = sorted((w.encode('utf-8'), r.encode('utf-8')) for w, r in dictionary.items())
+    max_len = max((len(w.decode('utf-8')) for w, _ in entries), default=0)
+
+    offset = _HEADER.size + _RECORD.size * len(entries)
+    records, blob = [], []
+    for word, reading in entries:
+        records.append(_RECORD.pack(offset, len(word), offset + len(word), len(reading)))
+        blob.append(word + reading)
+        offset += len(word) + len(reading)
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(entries), max_len))
+        f.writelines(records)
+        f.writelines(blob)
+    os.replace(tmp, target)
+    return len(entries)
+
+
+# ==================== ПОИСК ПО ИНДЕКСУ ====================
+
+class PinyinIndex:
+    """Словарь в mmap: страницы файла общие для всех воркеров, разбирать ничего не нужно"""
+
+    def __init__(self, path=INDEX_PATH):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.max_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Не индекс пиньиня: {path}")
+
+    def _record(self, i):
+        return _RECORD.unpack_from(self._mm, _HEADER.size + i * _RECORD.size)
+
+    def lookup(self, word):
+        """Чтение слова или None; двоичный поиск по байтам UTF-8"""
+        key = word.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_off, key_len, val_off, val_len = self._record(mid)
+            probe = self._mm[key_off:key_off + key_len]
+            if probe == key:
+                return self._mm[val_off:val_off + val_len].decode('utf-8')
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def segment(self, text):
+        """Разбиение по самому длинному совпадению: [(кусок, чтение или None)]"""
+        result = []
+        pos = 0
+        for match in _HAN.finditer(text):
+            if match.start() > pos:
+                result.append((text[pos:match.start()], None))
+            run, i = match.group(), 0
+            while i < len(run):
+                for size in range(min(self.max_len, len(run) - i), 0, -1):
+                    reading = self.lookup(run[i:i + size])
+                    if reading is not None or size == 1:
+                        result.append((run[i:i + size], reading))
+                        i += size
+                        break
+            pos = match.end()
+        if pos < len(text):
+            result.append((text[pos:], None))
+        return result
+
+
+def _is_stale(index_path, source_path):
+    try:
+        return os.stat(index_path).st_mtime_ns < os.stat(source_path).st_mtime_ns
+    except FileNotFoundError:
+        return True
+
+
+def load_index():
+    """Индекс один раз на процесс; если его нет или TSV новее — собирается заново"""
+    global _index
+    if _index is not None:
+        return _index
+    with _lock:
+        if _index is None:
+            if _is_stale(INDEX_PATH, DICTIONARY_PATH) or _is_stale(INDEX_PATH, WORDS_PATH):
+                build_index()
+            _index = PinyinIndex()
+    return _index
+
+
+# ==================== АННОТАЦИЯ ====================
+
+def to_pinyin(text):
+    """Пиньинь китайских слов строки через пробел; '' если китайского в строке нет"""
+    readings = [reading or piece for piece, reading in load_index().segment(text)
+                if reading is not None or _HAN.fullmatch(piece)]
+    return ' '.join(readings)
+
+
+def ruby(text):
+    """HTML с <ruby>: чтение над каждым словом"""
+    parts = []
+    for piece, reading in load_index().segment(str(text)):
+        if reading is None:
+            parts.append(escape(piece))
+        else:
+            parts.append(Markup('<ruby>{}<rt>{}</rt></ruby>').format(piece, reading))
+    return Markup('').join(parts)
@@ -0,0 +1,73 @@
+# routes/render_pool.py
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from .admission import REJECTED, Overloaded
+
+# Пул свой у каждого воркера gunicorn (а их по умолчанию столько же, сколько ядер),
+# поэтому процессов на воркер немного — иначе на машине окажется ядер² процессов вёрстки
+RENDER_PROCESSES = int(os.environ.get("RENDER_PROCESSES", min(2, os.cpu_count() or 1)))
+# Воркер gthread многопоточный, а fork из многопоточного процесса может унести в потомка
+# чужие захваченные блокировки — процессы пула запускаются начисто
+RENDER_START_METHOD = os.environ.get(
+    "RENDER_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+_lock = threading.Lock()
+_pool = None
+
+
+# ==================== ПУЛ ПРОЦЕССОВ ДЛЯ ВЁРСТКИ PDF ====================
+
+def get_pool():
+    """Пул создаётся при первом обращении; вёрстка fpdf упирается в GIL, поэтому процессы"""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                # Шрифт тянет fpdf — импорт откладывается до первого пула, а не до старта приложения
+                from .fonts import load_fonts
+                _pool = ProcessPoolExecutor(
+                    max_workers=RENDER_PROCESSES,
+                    mp_context=multiprocessing.get_context(RENDER_START_METHOD),
+                    initializer=load_fonts,
+                )
+    return _pool
+
+
+def wait_all(futures, timeout=None):
+    """Результаты по порядку; timeout — общий срок на все задачи, а не на каждую.
+
+    Если срок вышел или задача упала, ещё не начатые задачи отменяются.
+    Просроченный рендер — Overloaded, маршруты отвечают на него 503 с Retry-After.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        return [
+            future.result(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+            for future in futures
+        ]
+    except TimeoutError:
+        REJECTED.inc("render_timeout")
+        raise Overloaded("render_timeout")
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def render_many(func, jobs, timeout=None):
+    """Запускает func(*args) для каждого набора аргументов в пуле, порядок результатов сохраняется"""
+    pool = get_pool()
+    return wait_all([pool.submit(func, *args) for args in jobs], timeout)
+
+
+def shutdown_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
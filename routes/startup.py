@@ -0,0 +1,119 @@
+# routes/startup.py
+import glob
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import jinja2
+from jinja2 import ChoiceLoader, ModuleLoader
+
+from .cache import content_key
+from .metrics import REGISTRY, Gauge
+
+logger = logging.getLogger(__name__)
+
+# preload — всё тяжёлое грузится до fork (по умолчанию);
+# lazy — старт без fpdf и шрифта, прогрев идёт фоном в каждом воркере
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "preload")
+LAZY_START = STARTUP_MODE == "lazy"
+# Бюджет холодного старта в секундах: если превышен, отчёт пишется предупреждением
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET", 1.5))
+# Каталог архивов скомпилированных шаблонов; имя архива содержит ключ исходников и версии Jinja
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", tempfile.gettempdir())
+
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    "chinese_startup_step_seconds", "Длительность шагов запуска и прогрева", ("step",)))
+
+
+def _rss_mb():
+    """Текущая резидентная память процесса; без /proc — пиковая из getrusage"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ==================== ОТЧЁТ О ЗАПУСКЕ ====================
+
+class StartupReport:
+    """Время и прирост памяти по шагам запуска: импорты, загрузка данных, прогрев"""
+
+    def __init__(self):
+        self.steps = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        started, memory = time.perf_counter(), _rss_mb()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.steps.append((name, seconds, _rss_mb() - memory))
+            STARTUP_SECONDS.inc(name, amount=seconds)
+
+    def total(self, names=None):
+        return sum(seconds for name, seconds, _ in self.steps if names is None or name in names)
+
+    def log(self, title, names=None):
+        """Пишет в лог шаги (все или перечисленные); превышение бюджета — предупреждением"""
+        lines = [
+            f"  {name:<32} {seconds * 1000:8.1f} мс {memory:+8.1f} МБ"
+            for name, seconds, memory in self.steps if names is None or name in names
+        ]
+        total = self.total(names)
+        level = logging.WARNING if total > STARTUP_BUDGET else logging.INFO
+        logger.log(
+            level, "%s: %.2f с (бюджет %.2f с), память %.1f МБ\n%s",
+            title, total, STARTUP_BUDGET, _rss_mb(), '\n'.join(lines),
+        )
+
+
+REPORT = StartupReport()
+
+
+# ==================== ПРЕДКОМПИЛЯЦИЯ ШАБЛОНОВ ====================
+
+def _templates_key(env, names):
+    """Хэш содержимого всех шаблонов, их имён и версии Jinja (у другой версии другой байткод)"""
+    sources = [env.loader.get_source(env, name)[1] for name in names]
+    return content_key(sources, *names, jinja2.__version__)
+
+
+def _remove_old_archives(current):
+    """Архивы прежних ключей больше не нужны: без этого каждая правка шаблона оставляла бы файл"""
+    pattern = os.path.join(os.path.dirname(current), "chinese_templates-*.zip")
+    for path in glob.glob(pattern):
+        if path != current:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def precompile_templates(app, directory=TEMPLATE_CACHE_DIR):
+    """Шаблоны компилируются в Python-модули (zip) один раз; на старте они только импортируются.
+
+    Архив называется по ключу шаблонов: другая версия шаблонов (другой checkout, правка)
+    или другая версия Jinja получает свой архив, чужой или устаревший не подхватится.
+    Собрав новый архив, удаляет архивы прежних ключей.
+    """
+    env = app.jinja_env
+    # Flask отдаёт имена из множества, порядок от запуска к запуску разный
+    names = sorted(env.list_templates(extensions=['html']))
+    target = os.path.join(directory, f"chinese_templates-{_templates_key(env, names)[:32]}.zip")
+    if not os.path.exists(target):
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        env.compile_templates(tmp, extensions=['html'], zip='deflated', ignore_errors=False)
+        os.replace(tmp, target)
+        _remove_old_archives(target)
+    env.loader = ChoiceLoader([ModuleLoader(target), env.loader])
+    return len(names)
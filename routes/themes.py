@@ -1,496 +1,139 @@
 # themes.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
 
-def convert_to_chinese(num):
-    """Простой перевод чисел 1–100 в китайские иероглифы"""
-    if num == 100:
-        return '一百'
-    if num <= 10:
-        mapping = {1: '一', 2: '二', 3: '三', 4: '四', 5: '五',
-                   6: '六', 7: '七', 8: '八', 9: '九', 10: '十'}
-        return mapping[num]
-    elif 11 <= num <= 19:
-        return '十' + convert_to_chinese(num - 10)
-    elif num % 10 == 0:
-        tens = {2: '二十', 3: '三十', 4: '四十', 5: '五十',
-                6: '六十', 7: '七十', 8: '八十', 9: '九十'}
-        return tens[num // 10]
-    else:
-        return convert_to_chinese(num // 10 * 10) + convert_to_chinese(num % 10)
-
-
-# ==================== ВСЕ ТЕМЫ ====================
-THEMES = {
-
-    # =============== ТЕМАТИЧЕСКИЕ ===============
-
-    "numbers_1_100": {
-        "name": "Цифры 1–5, 10–100",
-        "type": "numbers",
-        "theory": [
-            "1–10: 一、二、三、四、五、六、七、八、九、十",
-            "11–19: 十一、十二... 十九",
-            "20, 30... 100: 二十、三十... 一百"
-        ],
-        "data": {i: convert_to_chinese(i) for i in list(range(1, 6)) + list(range(10, 101, 10)) + [23, 45, 67, 89]}
-    },
-
-    "family": {
-        "name": "Семья",
-        "type": "vocabulary",
-        "theory": ["Семейные отношения в китайском языке"],
-        "data": {
-            "爸爸": "отец", "妈妈": "мать", "哥哥": "старший брат", "姐姐": "старшая сестра",
-            "弟弟": "младший брат", "妹妹": "младшая сестра", "爷爷": "дедушка", "奶奶": "бабушка",
-            "儿子": "сын", "女儿": "дочь", "丈夫": "муж", "妻子": "жена"
-        },
-        "ready_lesson": True  # <-- добавлено
-    },
-
-    "age": {
-        "name": "Сколько тебе лет?",
-        "type": "grammar",
-        "theory": ["你几岁？ — Сколько тебе лет?", "我十岁。 — Мне 10 лет."],
-        "data": {
-            "你几岁？": "Сколько тебе лет?",
-            "我五岁。": "Мне 5 лет.",
-            "他十二岁。": "Ему 12 лет.",
-            "她八岁。": "Ей 8 лет.",
-            "我二十岁。": "Мне 20 лет."
-        }
-    },
-
-    "time": {
-        "name": "Время",
-        "type": "vocabulary",
-        "theory": ["现在几点？ — Который час?", "点 = час, 分 = минута"],
-        "data": {
-            "现在八点。": "Сейчас 8 часов.",
-            "现在九点半。": "Сейчас 9:30.",
-            "现在十一点十五分。": "Сейчас 11:15.",
-            "现在十二点。": "Сейчас 12 часов.",
-            "现在七点四十五分。": "Сейчас 7:45."
-        }
-    },
-
-    "date": {
-        "name": "Дата",
-        "type": "vocabulary",
-        "theory": ["年 = год, 月 = месяц, 日/号 = день"],
-        "data": {
-            "今天是2025年10月27日。": "Сегодня 27 октября 2025 года.",
-            "我的生日是5月3日。": "Мой день рождения — 3 мая.",
-            "新年是1月1日。": "Новый год — 1 января."
-        }
-    },
-
-    "countries": {
-        "name": "Страны и национальности",
-        "type": "vocabulary",
-        "theory": ["Я из России → 我是俄罗斯人。"],
-        "data": {
-            "中国": "Китай", "俄罗斯": "Россия", "美国": "США", "日本": "Япония",
-            "韩国": "Корея", "法国": "Франция", "德国": "Германия",
-            "中国人": "китаец", "俄罗斯人": "русский", "美国人": "американец"
-        }
-    },
-
-    "colors": {
-        "name": "Цвета",
-        "type": "vocabulary",
-        "theory": ["红色 — красный, 蓝色 — синий"],
-        "data": {
-            "红色": "красный", "蓝色": "синий", "绿色": "зелёный", "黄色": "жёлтый",
-            "黑色": "чёрный", "白色": "белый", "紫色": "фиолетовый", "橙色": "оранжевый"
-        }
-    },
-
-    "zodiac_animals": {
-        "name": "Животные китайского календаря",
-        "type": "vocabulary",
-        "theory": ["12 животных: 鼠, 牛, 虎..."],
-        "data": {
-            "鼠": "крыса", "牛": "бык", "虎": "тигр", "兔": "кролик",
-            "龙": "дракон", "蛇": "змея", "马": "лошадь", "羊": "овца",
-            "猴": "обезьяна", "鸡": "петух", "狗": "собака", "猪": "свинья"
-        }
-    },
-
-    "animals": {
-        "name": "Животные",
-        "type": "vocabulary",
-        "theory": ["Общие животные"],
-        "data": {
-            "猫": "кот", "狗": "собака", "鸟": "птица", "鱼": "рыба",
-            "大象": "слон", "老虎": "тигр", "狮子": "лев", "熊猫": "панда"
-        }
-    },
-
-    "new_year": {
-        "name": "Новый год",
-        "type": "vocabulary",
-        "theory": ["春节 — Китайский Новый год"],
-        "data": {
-            "春节": "Китайский Новый год", "红包": "красный конверт", "饺子": "пельмени",
-            "新年快乐！": "С Новым годом!", "恭喜发财！": "Богатства и удачи!"
-        }
-    },
-
-    "clothes": {
-        "name": "Одежда",
-        "type": "vocabulary",
-        "theory": ["红色的裙子 — красная юбка"],
-        "data": {
-            "衬衫": "рубашка", "裙子": "юбка", "裤子": "брюки", "鞋子": "обувь",
-            "帽子": "шляпа", "外套": "пальто", "袜子": "носки"
-        }
-    },
-
-    "weather": {
-        "name": "Погода",
-        "type": "vocabulary",
-        "theory": ["今天天气怎么样？ — Какая сегодня погода?"],
-        "data": {
-            "晴天": "солнечно", "雨天": "дождливо", "雪天": "снежно", "阴天": "пасмурно",
-            "热": "жарко", "冷": "холодно", "暖和": "тепло"
-        }
-    },
-
-    "food_drinks": {
-        "name": "Еда, напитки",
-        "type": "vocabulary",
-        "theory": ["你喜欢吃什么？ — Что ты любишь есть?"],
-        "data": {
-            "米饭": "рис", "面条": "лапша", "茶": "чай", "咖啡": "кофе",
-            "水": "вода", "苹果": "яблоко", "面包": "хлеб", "鸡蛋": "яйцо"
-        }
-    },
-
-    "hobbies": {
-        "name": "Хобби",
-        "type": "vocabulary",
-        "theory": ["我喜欢唱歌。 — Я люблю петь."],
-        "data": {
-            "唱歌": "петь", "跳舞": "танцевать", "看书": "читать", "画画": "рисовать",
-            "游泳": "плавать", "打篮球": "играть в баскетбол", "听音乐": "слушать музыку"
-        }
-    },
-
-    "city_places": {
-        "name": "Места в городе",
-        "type": "vocabulary",
-        "theory": ["学校 — школа, 医院 — больница"],
-        "data": {
-            "学校": "школа", "医院": "больница", "商店": "магазин", "公园": "парк",
-            "银行": "банк", "邮局": "почта", "餐厅": "ресторан", "家": "дом"
-        }
-    },
-
-    "transport": {
-        "name": "Транспорт",
-        "type": "vocabulary",
-        "theory": ["坐公交车 — ехать на автобусе"],
-        "data": {
-            "公交车": "автобус", "地铁": "метро", "出租车": "такси", "自行车": "велосипед",
-            "飞机": "самолёт", "火车": "поезд", "船": "корабль"
-        }
-    },
-
-    "sports": {
-        "name": "Спорт",
-        "type": "vocabulary",
-        "theory": ["打乒乓球 — играть в пинг-понг"],
-        "data": {
-            "足球": "футбол", "篮球": "баскетбол", "乒乓球": "пинг-понг",
-            "游泳": "плавание", "跑步": "бег", "网球": "теннис"
-        }
-    },
+from .hsk import load_vocabulary
+from .numerals import chinese_range, to_chinese, to_chinese_many
 
-    "house": {
-        "name": "Дом",
-        "type": "vocabulary",
-        "theory": ["房间里有什么？ — Что в комнате?"],
-        "data": {
-            "桌子": "стол", "椅子": "стул", "床": "кровать", "门": "дверь",
-            "窗户": "окно", "灯": "лампа", "厨房": "кухня", "浴室": "ванная"
-        }
-    },
+THEMES_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'themes')
+# Как часто (в секундах) проверять, не изменились ли файлы тем
+THEMES_CHECK_INTERVAL = float(os.environ.get("THEMES_CHECK_INTERVAL", 2))
+# Сколько тем держать загруженными в памяти одновременно
+THEMES_CACHE_SIZE = int(os.environ.get("THEMES_CACHE_SIZE", 256))
 
-    "body": {
-        "name": "Тело",
-        "type": "vocabulary",
-        "theory": ["身体部位 — части тела"],
-        "data": {
-            "头": "голова", "眼睛": "глаза", "鼻子": "нос", "嘴": "рот",
-            "手": "рука", "脚": "нога", "耳朵": "уши", "脸": "лицо"
-        }
-    },
 
-    "shopping": {
-        "name": "Покупки в магазине",
-        "type": "grammar",
-        "theory": ["多少钱？ — Сколько стоит?", "太贵了！ — Слишком дорого!"],
-        "data": {
-            "多少钱？": "Сколько стоит?",
-            "这个多少钱？": "Сколько стоит это?",
-            "太贵了！": "Слишком дорого!",
-            "便宜一点！": "Сделайте дешевле!",
-            "我要买这个。": "Я хочу купить это."
-        }
-    },
-
-    "comparisons": {
-        "name": "Он выше меня",
-        "type": "grammar",
-        "theory": ["A 比 B + прилагательное"],
-        "data": {
-            "他比我高。": "Он выше меня.",
-            "这本书比那本便宜。": "Эта книга дешевле той.",
-            "今天比昨天冷。": "Сегодня холоднее, чем вчера.",
-            "我比你大。": "Я старше тебя."
-        }
-    },
-
-    "phone_call": {
-        "name": "Звонок другу",
-        "type": "grammar",
-        "theory": ["喂？ — Алло?", "你在干什么？ — Чем занимаешься?"],
-        "data": {
-            "喂？": "Алло?",
-            "你好吗？": "Как дела?",
-            "你在干什么？": "Чем занимаешься?",
-            "我在看书。": "Я читаю.",
-            "再见！": "Пока!"
-        }
-    },
-
-
-    # =============== ГРАММАТИЧЕСКИЕ ===============
-
-    "hello": {
-        "name": "Приветствие",
-        "type": "grammar",
-        "theory": ["你好！ — Привет!", "您好！ — Здравствуйте (вежливо)"],
-        "data": {
-            "你好！": "Привет!",
-            "您好！": "Здравствуйте!",
-            "大家好！": "Привет всем!",
-            "早上好！": "Доброе утро!"
-        }
-    },
-
-    "goodbye": {
-        "name": "Прощание",
-        "type": "grammar",
-        "theory": ["再见！ — До свидания!"],
-        "data": {
-            "再见！": "До свидания!",
-            "明天见！": "Увидимся завтра!",
-            "拜拜！": "Пока! (неформально)",
-            "晚安！": "Спокойной ночи!"
-        }
-    },
-
-    "how_are_you": {
-        "name": "Как дела?",
-        "type": "grammar",
-        "theory": ["你好吗？ — Как дела?", "我很好，谢谢。"],
-        "data": {
-            "你好吗？": "Как дела?",
-            "我很好，谢谢。": "Отлично, спасибо.",
-            "还不错。": "Неплохо.",
-            "不太好。": "Не очень."
-        }
-    },
-
-    "politeness": {
-        "name": "Фразы вежливости",
-        "type": "grammar",
-        "theory": ["谢谢！ — Спасибо!", "对不起！ — Извините!"],
-        "data": {
-            "谢谢！": "Спасибо!",
-            "不客气！": "Пожалуйста! (в ответ)",
-            "对不起！": "Извините!",
-            "没关系！": "Ничего страшного!",
-            "请！": "Пожалуйста! (просьба)"
-        }
-    },
-
-    "pronouns": {
-        "name": "Местоимения",
-        "type": "vocabulary",
-        "theory": ["我 — я, 你 — ты, 他 — он"],
-        "data": {
-            "我": "я", "你": "ты", "他": "он", "她": "она", "我们": "мы", "你们": "вы", "他们": "они"
-        }
-    },
-
-    "yes_no_questions": {
-        "name": "Общий вопрос",
-        "type": "grammar",
-        "theory": ["Ты студент? → 你是学生吗？"],
-        "data": {
-            "你是学生吗？": "Ты студент?",
-            "这是书吗？": "Это книга?",
-            "你喜欢茶吗？": "Ты любишь чай?",
-            "今天星期一吗？": "Сегодня понедельник?"
-        }
-    },
-
-    "bu_questions": {
-        "name": "Вопрос через 不",
-        "type": "grammar",
-        "theory": ["Ты не студент? → 你不是学生吗？"],
-        "data": {
-            "你不是老师吗？": "Ты разве не учитель?",
-            "他不喜欢咖啡吗？": "Он разве не любит кофе?",
-            "今天不是星期六吗？": "Сегодня разве не суббота?"
-        }
-    },
-
-    "what": {
-        "name": "Вопрос с 什么",
-        "type": "grammar",
-        "theory": ["什么 = «что?»"],
-        "data": {
-            "你吃什么？": "Что ты ешь?",
-            "这是什么？": "Что это?",
-            "你喜欢什么？": "Что тебе нравится?",
-            "什么名字？": "Как зовут?"
-        }
-    },
-
-    "yes_no_dont_know": {
-        "name": "Да, нет, не знаю",
-        "type": "vocabulary",
-        "theory": ["是 — да, 不是 — нет, 不知道 — не знаю"],
-        "data": {
-            "是": "да", "不是": "нет", "不知道": "не знаю",
-            "对": "верно", "不对": "неверно"
-        }
-    },
-
-    "like_dislike": {
-        "name": "Нравится, не нравится",
-        "type": "grammar",
-        "theory": ["我喜欢茶。 — Я люблю чай.", "我不喜欢咖啡。 — Я не люблю кофе."],
-        "data": {
-            "我喜欢音乐。": "Я люблю музыку.",
-            "我不喜欢雨。": "Я не люблю дождь.",
-            "你喜欢什么？": "Что тебе нравится?",
-            "他喜欢运动。": "Он любит спорт."
-        }
-    },
-
-    "age_question": {
-        "name": "Вопрос про возраст",
-        "type": "grammar",
-        "theory": ["你几岁？ — Сколько тебе лет?"],
-        "data": {
-            "你几岁？": "Сколько тебе лет?",
-            "他几岁？": "Сколько ему лет?",
-            "我十岁。": "Мне 10 лет.",
-            "她二十岁。": "Ей 20 лет."
-        }
-    },
-
-    "zodiac_year": {
-        "name": "В год кого ты родился?",
-        "type": "grammar",
-        "theory": ["你属什么？ — В год какого животного ты родился?"],
-        "data": {
-            "你属什么？": "В год какого животного ты родился?",
-            "我属龙。": "Я родился в год Дракона.",
-            "他属虎。": "Он родился в год Тигра.",
-            "属鼠的人很聪明。": "Люди, рождённые в год Крысы, умны."
-        }
-    },
-
-    "who": {
-        "name": "Вопрос с 谁",
-        "type": "grammar",
-        "theory": ["谁 = «кто?»"],
-        "data": {
-            "谁是老师？": "Кто учитель?",
-            "谁在看书？": "Кто читает?",
-            "这是谁的书？": "Чья это книга?",
-            "你喜欢谁？": "Кто тебе нравится?"
-        }
-    },
-
-    "he": {
-        "name": "Союз 和",
-        "type": "grammar",
-        "theory": ["和 = «и» между существительными"],
-        "data": {
-            "我和你": "Я и ты",
-            "茶和咖啡": "Чай и кофе",
-            "爸爸和妈妈": "Папа и мама",
-            "书和笔": "Книга и ручка"
-        }
-    },
-
-    "zhe_na_ne": {
-        "name": "这，那，哪",
-        "type": "grammar",
-        "theory": ["这 — этот (здесь), 那 — тот (там), 哪 — какой?"],
-        "data": {
-            "这是什么？": "Что это?",
-            "那是什么？": "Что то?",
-            "哪本书是你的？": "Какая книга твоя?",
-            "这个好。": "Этот хороший."
-        }
-    },
+def convert_to_chinese(num):
+    """Перевод числа в китайские иероглифы (обёртка над routes.numerals)"""
+    return to_chinese(num)
 
-    "ye": {
-        "name": "Частица 也 и её использование",
-        "type": "grammar",
-        "theory": ["也 = «тоже», ставится перед глаголом"],
-        "data": {
-            "我也喜欢茶。": "Я тоже люблю чай.",
-            "他也是学生。": "Он тоже студент.",
-            "我们也是朋友。": "Мы тоже друзья.",
-            "她也喝茶。": "Она тоже пьёт чай."
-        }
-    },
 
-    "negation": {
-        "name": "Отрицание",
-        "type": "grammar",
-        "theory": ["不 = «не» перед глаголами и прилагательными"],
-        "data": {
-            "我不喜欢。": "Мне не нравится.",
-            "他不是老师。": "Он не учитель.",
-            "今天不冷。": "Сегодня не холодно.",
-            "我不喝茶。": "Я не пью чай."
-        }
-    },
+# ==================== ЗАГРУЗКА ТЕМЫ ====================
 
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
 
-    # =============== HSK 3 ===============
 
-    "hsk3_situations": {
-        "name": "Повседневные ситуации (HSK 3)",
-        "type": "grammar",
-        "theory": [
-            "Уровень HSK 3:",
-            "около 600 слов",
-            "Повседневные ситуации",
-            "Ключевые конструкции:",
-            "把, 比, 已经, 还没",
-            "虽然…但是…, 因为…所以…"
-        ],
-        "data": {
-            "Я уже поел.": "我已经吃了。",
-            "Он положил книгу на стол.": "他把书放在桌子上了。",
-            "Хотя идёт дождь, я пойду гулять.": "虽然下雨，但是我还是去散步。",
-            "Почему ты опоздал?": "你为什么迟到了？",
-            "Я ещё не сделал домашку.": "我还没做作业呢。",
-            "Этот фильм интереснее того.": "这个电影比那个有意思。",
-            "Из-за дождя мы не пошли в парк.": "因为下雨，所以我们没去公园。",
-            "Не мог бы ты помочь мне?": "你能帮我一下吗？",
-            "Я не знаю, где мой телефон.": "我不知道我的手机在哪儿。",
-            "Если завтра будет солнечно, мы пойдём в парк.": "如果明天晴天，我们就去公园。"
-        }
+def build_theme(theme_id, summary, body):
+    """Тема в привычном виде (name, type, theory, data) плюс заранее посчитанный индекс"""
+    numbers = body.get("numbers")
+    if isinstance(numbers, dict):
+        # Диапазон {"from": 1, "to": 100} — включительно
+        data = chinese_range(numbers["from"], numbers["to"] + 1)
+    elif numbers is not None:
+        data = dict(zip(numbers, to_chinese_many(numbers)))
+    elif "hsk" in body:
+        data = dict(load_vocabulary().pairs(**body["hsk"]))
+    else:
+        data = body.get("data", {})
+
+    pairs = tuple((k, v) for k, v in data.items() if k and v and str(k).strip() and str(v).strip())
+    theme = {
+        "name": summary["name"],
+        "type": summary["type"],
+        "theory": body.get("theory", []),
+        "data": data,
     }
+    theme.update({k: v for k, v in body.items() if k not in ("theory", "data", "numbers")})
+    # Индекс: проверенные пары, ключи и метаданные типа считаются один раз при загрузке;
+    # по id генератор кэширует пространство упражнений темы
+    theme.update({
+        "id": theme_id,
+        "pairs": pairs,
+        "keys": tuple(k for k, _ in pairs),
+        "meta": {"type": summary["type"], "size": len(pairs)},
+    })
+    return theme
+
+
+# ==================== ХРАНИЛИЩЕ ТЕМ ====================
+
+class ThemeStore(Mapping):
+    """Темы из data/themes: каталог (index.json) читается сразу, тело темы — при первом обращении.
+
+    Изменённые файлы подхватываются без перезапуска; version растёт при каждой перезагрузке.
+    """
+
+    def __init__(self, directory=THEMES_DIR):
+        self.directory = directory
+        self.version = 0
+        self._lock = threading.RLock()
+        self._catalog = OrderedDict()
+        self._catalog_mtime = None
+        self._loaded = OrderedDict()
+        self._checked = {}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _due(self, key):
+        now = time.monotonic()
+        if now - self._checked.get(key, float('-inf')) < THEMES_CHECK_INTERVAL:
+            return False
+        self._checked[key] = now
+        return True
+
+    def catalog(self):
+        """Упорядоченный словарь id → {name, type} без загрузки тел тем"""
+        if self._catalog_mtime is None or self._due("index.json"):
+            with self._lock:
+                mtime = _mtime(self._path("index.json"))
+                if mtime != self._catalog_mtime:
+                    with open(self._path("index.json"), encoding="utf-8") as f:
+                        entries = json.load(f)
+                    self._catalog = OrderedDict((entry["id"], entry) for entry in entries)
+                    self._catalog_mtime = mtime
+                    self._loaded.clear()
+                    self.version += 1
+        return self._catalog
+
+    def __getitem__(self, theme_id):
+        summary = self.catalog()[theme_id]
+        path = self._path(f"{theme_id}.json")
+        loaded = self._loaded.get(theme_id)
+        if loaded is not None and not self._due(theme_id):
+            return loaded[1]
+
+        with self._lock:
+            mtime = _mtime(path)
+            loaded = self._loaded.get(theme_id)
+            if loaded is None or loaded[0] != mtime:
+                with open(path, encoding="utf-8") as f:
+                    body = json.load(f)
+                if loaded is not None:
+                    self.version += 1
+                loaded = (mtime, build_theme(theme_id, summary, body))
+                self._loaded[theme_id] = loaded
+            self._loaded.move_to_end(theme_id)
+            while len(self._loaded) > THEMES_CACHE_SIZE:
+                self._loaded.popitem(last=False)
+        return loaded[1]
+
+    def __contains__(self, theme_id):
+        return theme_id in self.catalog()
+
+    def __iter__(self):
+        return iter(list(self.catalog()))
+
+    def __len__(self):
+        return len(self.catalog())
 
-}
\ No newline at end of file
+
+# ==================== ВСЕ ТЕМЫ ====================
+THEMES = ThemeStore()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Модули приложения импортируются как routes.*, как в app.py и benchmarks/run.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,57 @@
+# tests/test_exercises.py
+import random
+
+from routes.exercises import ExerciseSpace, generate_exercises
+from routes.history import set_bits
+from routes.themes import THEMES
+
+
+def make_space():
+    return (ExerciseSpace()
+            .add_items("a", 3, [f"a{i}" for i in range(10)])
+            .add_items("b", 1, [f"b{i}" for i in range(5)])
+            .add("c", 2, 7, lambda i, rng: f"c{i}"))
+
+
+def test_sample_without_repeats():
+    space = make_space()
+    items = space.sample(space.size, random.Random(7))
+    assert len(items) == space.size == 22
+    assert len(set(items)) == space.size
+
+
+def test_sample_is_truncated_to_space_size():
+    space = make_space()
+    assert len(space.sample(100, random.Random(7))) == space.size
+
+
+def test_sample_same_seed_same_result():
+    space = make_space()
+    assert space.sample(12, random.Random(42)) == space.sample(12, random.Random(42))
+    assert space.sample(12, random.Random(42)) != space.sample(12, random.Random(43))
+
+
+def test_allow_repeats_goes_in_rounds():
+    space = make_space()
+    items = space.sample(space.size * 2 + 5, random.Random(1), allow_repeats=True)
+    assert len(items) == space.size * 2 + 5
+    # Каждый круг — все упражнения ровно по разу
+    assert sorted(items[:space.size]) == sorted(items[space.size:space.size * 2])
+    assert len(set(items[:space.size])) == space.size
+
+
+def test_unseen_come_first():
+    space = make_space()
+    seen = bytes(set_bits(bytearray((space.size + 7) // 8), range(0, 10)))
+    indexed = list(space.iter_sample_indexed(15, random.Random(3), seen=seen))
+    assert sorted(i for i, _ in indexed[:12]) == list(range(10, 22))
+    assert all(i < 10 for i, _ in indexed[12:])
+    assert len({i for i, _ in indexed}) == 15
+
+
+def test_generate_exercises_is_deterministic():
+    for theme_id in THEMES:
+        theme = THEMES[theme_id]
+        first = generate_exercises(theme, 15, seed=123)
+        assert first == generate_exercises(theme, 15, seed=123)
+        assert len(first) <= 15
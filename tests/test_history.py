@@ -0,0 +1,89 @@
+# tests/test_history.py
+import pytest
+
+from routes.history import HistoryStore, count_bits, normalize_student
+
+SIZE = 20
+FINGERPRINT = "f" * 32
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path))
+
+
+def test_no_history_is_empty(store):
+    assert store.seen("anna", "family", FINGERPRINT) == b''
+
+
+def test_record_marks_ids(store):
+    store.record("anna", "family", FINGERPRINT, SIZE, [0, 3, 19])
+    assert count_bits(store.seen("anna", "family", FINGERPRINT)) == 3
+
+
+def test_whole_space_at_once_starts_empty_cycle(store):
+    store.record("anna", "family", FINGERPRINT, SIZE, range(SIZE))
+    assert count_bits(store.seen("anna", "family", FINGERPRINT)) == 0
+
+
+def test_cycle_keeps_only_last_batch(store):
+    store.record("anna", "family", FINGERPRINT, SIZE, range(0, 15))
+    store.record("anna", "family", FINGERPRINT, SIZE, range(15, SIZE))
+    # Новый круг: только что выданное не должно сразу повториться
+    assert count_bits(store.seen("anna", "family", FINGERPRINT)) == SIZE - 15
+    # Остальные 15 снова закрывают круг — теперь помнятся они
+    store.record("anna", "family", FINGERPRINT, SIZE, range(0, 15))
+    assert count_bits(store.seen("anna", "family", FINGERPRINT)) == 15
+
+
+def test_changed_fingerprint_resets(store):
+    store.record("anna", "family", FINGERPRINT, SIZE, [1, 2])
+    assert store.seen("anna", "family", "0" * 32) == b''
+
+
+def test_forget(store):
+    store.record("anna", "family", FINGERPRINT, SIZE, [1])
+    store.record("anna", "numbers", FINGERPRINT, SIZE, [1])
+    store.forget("anna", "family")
+    assert store.seen("anna", "family", FINGERPRINT) == b''
+    assert store.seen("anna", "numbers", FINGERPRINT) != b''
+    store.forget("anna")
+    assert store.seen("anna", "numbers", FINGERPRINT) == b''
+
+
+def test_normalize_student():
+    assert normalize_student("  7Б   Иванова ") == "7б иванова"
+    assert normalize_student("   ") is None
+    with pytest.raises(ValueError):
+        normalize_student("x" * 65)
+
+
+def test_sheet_remembers_bitmap_it_was_drawn_with(store):
+    store.record("anna", "family", FINGERPRINT, SIZE, [1, 2], seed=7, seen=b'\x01\x00\x00')
+    assert store.sheet_seen("anna", "family", 7, FINGERPRINT) == b'\x01\x00\x00'
+    assert store.sheet_seen("anna", "family", 8, FINGERPRINT) is None
+    assert store.sheet_seen("anna", "family", 7, "0" * 32) is None
+    store.forget("anna")
+    assert store.sheet_seen("anna", "family", 7, FINGERPRINT) is None
+
+
+def test_viewing_does_not_record_and_issued_sheet_replays(store, monkeypatch):
+    from routes import exercises
+    from routes.themes import THEMES
+    monkeypatch.setattr(exercises, "HISTORY", store)
+    theme = THEMES["family"]
+    space, _ = exercises.exercise_space(theme)
+    fingerprint = space.fingerprint(theme.get("name"), theme.get("pairs") or theme.get("data") or theme.get("hsk"))
+
+    preview = exercises.generate_exercises(theme, 5, seed=1, student="anna", record=False)
+    assert store.seen("anna", "family", fingerprint) == b''
+
+    issued = exercises.generate_exercises(theme, 5, seed=1, student="anna")
+    assert issued == preview
+    seen = store.seen("anna", "family", fingerprint)
+    assert count_bits(seen) > 0
+
+    # Повторный показ и повторная выдача того же кода дают тот же лист и не сдвигают историю
+    assert exercises.generate_exercises(theme, 5, seed=1, student="anna", record=False) == issued
+    assert exercises.generate_exercises(theme, 5, seed=1, student="anna") == issued
+    assert store.seen("anna", "family", fingerprint) == seen
@@ -0,0 +1,29 @@
+# tests/test_hsk.py
+import pytest
+
+from routes.hsk import load_vocabulary
+
+
+def test_default_is_bundled_levels():
+    vocabulary = load_vocabulary()
+    levels = vocabulary.levels()
+    assert levels[0] == 1
+    assert {w.level for w in vocabulary.words()} == set(levels)
+
+
+@pytest.mark.parametrize("kwargs", [{"max_level": 6}, {"min_level": 4, "max_level": 4}])
+def test_missing_level_fails(kwargs):
+    with pytest.raises(ValueError, match="нет во встроенном словаре"):
+        load_vocabulary().words(**kwargs)
+
+
+@pytest.mark.parametrize("kwargs", [{"max_level": 0}, {"min_level": 3, "max_level": 2}, {"max_level": 7}])
+def test_invalid_levels(kwargs):
+    with pytest.raises(ValueError, match="Неверные уровни"):
+        load_vocabulary().words(**kwargs)
+
+
+def test_topic_query():
+    words = load_vocabulary().words(max_level=3, topic="family")
+    assert {"爸爸", "在", "喜欢"} <= {w.hanzi for w in words}
+    assert all("family" in w.topics and w.level <= 3 for w in words)
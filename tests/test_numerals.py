@@ -0,0 +1,84 @@
+# tests/test_numerals.py
+import random
+
+import pytest
+
+from routes.numerals import FINANCIAL, LIANG, MAX_NUMBER, PLAIN, from_chinese, to_chinese
+
+
+@pytest.mark.parametrize("style", [PLAIN, LIANG, FINANCIAL])
+def test_round_trip_small(style):
+    for num in range(-100, 10001):
+        assert from_chinese(to_chinese(num, style)) == num
+
+
+@pytest.mark.parametrize("style", [PLAIN, LIANG, FINANCIAL])
+def test_round_trip_large(style):
+    rng = random.Random(2024)
+    numbers = [rng.randint(0, MAX_NUMBER) for _ in range(2000)]
+    numbers += [10 ** k for k in range(16)] + [10 ** k + 1 for k in range(16)] + [MAX_NUMBER]
+    for num in numbers:
+        assert from_chinese(to_chinese(num, style)) == num
+
+
+@pytest.mark.parametrize("num, text", [
+    (0, "零"),
+    (10, "十"),
+    (15, "十五"),
+    (105, "一百零五"),
+    (110, "一百一十"),
+    (1005, "一千零五"),
+    (1010, "一千零一十"),
+    (10005, "一万零五"),
+    (100000, "十万"),
+    (100000001, "一亿零一"),
+    (-5, "负五"),
+])
+def test_zero_placement(num, text):
+    assert to_chinese(num) == text
+
+
+@pytest.mark.parametrize("num, text", [
+    (2, "二"),
+    (12, "十二"),
+    (22, "二十二"),
+    (200, "两百"),
+    (2000, "两千"),
+    (20000, "两万"),
+    (220000, "二十二万"),
+])
+def test_liang(num, text):
+    assert to_chinese(num, LIANG) == text
+
+
+@pytest.mark.parametrize("num, text", [
+    (10, "壹拾"),
+    (15, "壹拾伍"),
+    (220, "贰佰贰拾"),
+    (1005, "壹仟零伍"),
+])
+def test_financial(num, text):
+    assert to_chinese(num, FINANCIAL) == text
+
+
+@pytest.mark.parametrize("text, num", [
+    ("二〇二四", 2024),
+    ("两千", 2000),
+    ("兩萬", 20000),
+    ("负三", -3),
+    ("一万亿", 10 ** 12),
+])
+def test_from_chinese_forms(text, num):
+    assert from_chinese(text) == num
+
+
+@pytest.mark.parametrize("num", [MAX_NUMBER + 1, -MAX_NUMBER - 1])
+def test_out_of_range(num):
+    with pytest.raises(ValueError):
+        to_chinese(num)
+
+
+@pytest.mark.parametrize("text", ["", "负", "abc"])
+def test_from_chinese_invalid(text):
+    with pytest.raises(ValueError):
+        from_chinese(text)
@@ -0,0 +1,19 @@
+# wsgi.py
+import gc
+import logging
+
+from app import create_app, warm_up
+from routes.startup import LAZY_START, REPORT
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] [%(process)d] [%(levelname)s] %(message)s")
+
+app = create_app()
+if not LAZY_START:
+    warm_up(app)
+
+    # Всё, что создано при прогреве, больше не трогается сборщиком мусора,
+    # иначе он пометит страницы памяти как изменённые и copy-on-write не сработает
+    gc.freeze()
+# В режиме lazy прогрев запускает каждый воркер сам (post_worker_init в gunicorn.conf.py)
+
+REPORT.log("Запуск приложения")